@@ -2,7 +2,7 @@
 import os
 from typing import List
 from core.agent_text_language import AgentTextActionLanguage
-from core.llm_client import LLMClient
+from core.llm_client import get_default_client
 from core.prompt_expert import prompt_expert
 from core.action_context import ActionContext
 from core.agent import Agent
@@ -47,32 +47,36 @@ goals = [
             description="Call terminate when done and provide a complete feature development for the project in the message parameter")
 ]
 
-registry = AgentRegistry()
-llm_client = LLMClient()
+# Process-isolated tools run in forkserver workers, which re-import this module;
+# the guard keeps them from building and running the agent again
+if __name__ == "__main__":
+    registry = AgentRegistry()
+    llm_client = get_default_client()
 
-action_context = ActionContext({
-    'agent_registry': registry,
-    "llm": llm_client.generate_response,
+    action_context = ActionContext({
+        'agent_registry': registry,
+        "llm": llm_client.generate_response,
+        "llm_client": llm_client,
 
-    # Other shared resources...
-})
+        # Other shared resources...
+    })
 
-# Create an agent instance with tag-filtered actions
-developer_agent = Agent(
-    goals=goals,
-    agent_language=AgentFunctionCallingActionLanguage(),
-    # The ActionRegistry now automatically loads tools with these tags
-    action_registry=PythonActionRegistry(tags=["system", "feature_development"]),
-    generate_response=llm_client.generate_response,
-    environment=Environment(),
-   
-    
-)
+    # Create an agent instance with tag-filtered actions
+    developer_agent = Agent(
+        goals=goals,
+        agent_language=AgentFunctionCallingActionLanguage(),
+        # The ActionRegistry now automatically loads tools with these tags
+        action_registry=PythonActionRegistry(tags=["system", "feature_development"]),
+        generate_response=llm_client.generate_response,
+        environment=Environment(),
+
+
+    )
 
-# Run the agent with user input
-# capabilities=[ PlanFirstCapability(track_progress=True) ],
-user_input = "I want to develop a new feature that allows users to submit feedback on the application. The feature should include a form for users to enter their feedback, a way to submit it, and a confirmation message after submission. The feedback should be stored in a database for later review by the development team."
-final_memory = developer_agent.run(user_input)
+    # Run the agent with user input
+    # capabilities=[ PlanFirstCapability(track_progress=True) ],
+    user_input = "I want to develop a new feature that allows users to submit feedback on the application. The feature should include a form for users to enter their feedback, a way to submit it, and a confirmation message after submission. The feedback should be stored in a database for later review by the development team."
+    final_memory = developer_agent.run(user_input)
 
 
 
@@ -43,7 +43,9 @@ Analyze:
 
 @register_tool(
     description="Update code review status in project management system",
-    tags=["project_management"]
+    tags=["project_management"],
+    timeout=30,
+    max_concurrency=4
 )
 def update_review_status(action_context: ActionContext, 
                         review_id: str, 
@@ -63,7 +65,8 @@ def update_review_status(action_context: ActionContext,
     response = requests.post(
         f"https://...someapi.../reviews/{review_id}/status",
         headers=headers,
-        json={"status": status}
+        json={"status": status},
+        timeout=25
     )
     
     if response.status_code != 200:
@@ -1,4 +1,7 @@
-from typing import Callable, Dict, Any
+import inspect
+from typing import Callable, Dict, Any, List
+from core.injection import InjectionPlan, build_injection_plan
+from core.json_schema import SchemaValidationError, compile_validator
 
 
 class Action:
@@ -7,12 +10,56 @@ class Action:
                  function: Callable,
                  description: str,
                  parameters: Dict,
-                 terminal: bool = False):
+                 terminal: bool = False,
+                 cacheable: bool = False,
+                 ttl: float = None,
+                 cache_key: Callable = None,
+                 timeout: float = None,
+                 max_concurrency: int = None,
+                 isolation: str = None):
         self.name = name
         self.function = function
         self.description = description
         self.terminal = terminal
         self.parameters = parameters
+        # Result memoization, see register_tool(cacheable=...)
+        self.cacheable = cacheable
+        self.ttl = ttl
+        self.cache_key = cache_key
+        # Execution limits, see register_tool(timeout=..., max_concurrency=...)
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        # "process" runs the tool in a worker process, see core.process_sandbox
+        self.isolation = isolation
+        self._injection_plan = None
+        self._validator = None
+
+    @property
+    def injection_plan(self) -> InjectionPlan:
+        """Dependencies to inject on dispatch; computed once, normally at registration"""
+        if self._injection_plan is None:
+            self._injection_plan = build_injection_plan(self.function)
+        return self._injection_plan
+
+    @property
+    def validator(self) -> Callable[[dict], List[str]]:
+        """Argument checker compiled from the parameters schema on first use"""
+        if self._validator is None:
+            parameters = inspect.signature(self.function).parameters.values()
+            takes_kwargs = any(p.kind == p.VAR_KEYWORD for p in parameters)
+            self._validator = compile_validator(self.parameters or {}, allow_extra=takes_kwargs)
+        return self._validator
+
+    def validate_args(self, args: dict):
+        """
+        Check arguments chosen by the LLM against the parameters schema.
+
+        Raises:
+            SchemaValidationError: Listing every missing, unexpected or mistyped argument
+        """
+        errors = self.validator(args)
+        if errors:
+            raise SchemaValidationError(errors, f"arguments for '{self.name}'")
 
     def execute(self, **args) -> Any:
         """Execute the action's function"""
@@ -1,25 +1,125 @@
 import json
 import time
 import traceback
+from core.action_registry import UnknownToolError
 from core.environment import Environment
 from core.action import Action
 from core.goal import Goal
+from core.json_schema import SchemaValidationError
 from core.memory import Memory
 from core.prompt import Prompt
+from core.response_parser import TruncatedResponseError
+from core.result_rendering import ResultRenderingPolicy
+from core.serialization import dumps, render
 from dataclasses import dataclass, field
 from typing import List, Callable, Dict, Any
 
+# Rendered goal and tool blocks kept per language instance
+RENDER_CACHE_SIZE = 16
+
+
 class AgentLanguage:
     def __init__(self):
-        pass
+        self._goals_cache = {}
+        self._actions_cache = {}
+        # Set to None to send every environment result verbatim
+        self.result_policy = ResultRenderingPolicy()
 
     def construct_prompt(self,
                          actions: List[Action],
                          environment: Environment,
                          goals: List[Goal],
-                         memory: Memory) -> Prompt:
+                         memory: Memory,
+                         actions_version: int = None) -> Prompt:
         raise NotImplementedError("Subclasses must implement this method")
 
 
     def parse_response(self, response: str) -> dict:
-        raise NotImplementedError("Subclasses must implement this method")
\ No newline at end of file
+        raise NotImplementedError("Subclasses must implement this method")
+
+    def adapt_prompt_after_parsing_error(self,
+                                         prompt: Prompt,
+                                         response: str,
+                                         traceback: str,
+                                         error: Any,
+                                         retries_left: int) -> Prompt:
+        """Build the prompt used to re-ask the LLM after its response could not be parsed."""
+        if isinstance(error, SchemaValidationError):
+            problem = "called a tool with invalid arguments"
+        elif isinstance(error, UnknownToolError):
+            problem = "called a tool that does not exist"
+        elif isinstance(error, TruncatedResponseError):
+            problem = "was cut off before the tool invocation was complete, so it was not run"
+        else:
+            problem = "could not be parsed"
+        messages = prompt.messages + [
+            {"role": "assistant", "content": response},
+            {"role": "user", "content": (
+                f"Your last response {problem}: {error}\n"
+                "Respond again with exactly one tool invocation as a JSON object "
+                'of the form {"tool": "<tool_name>", "args": {...}}.'
+            )}
+        ]
+        return Prompt(messages=messages, tools=prompt.tools, metadata=prompt.metadata)
+
+    def handle_unparseable_response(self, response: str, error: Exception) -> dict:
+        """Called when a response still cannot be parsed after all re-asks."""
+        raise error
+
+    def format_memory(self, memory: Memory) -> List:
+        """Generate response from language model"""
+        # Map all environment results to a role:user messages
+        # Map all assistant messages to a role:assistant messages
+        # Map all user messages to a role:user messages
+        items = memory.get_memories()
+        policy = getattr(self, "result_policy", None)
+        # Age of an environment result = how many results came after it
+        results_left = sum(1 for item in items if item["type"] == "environment") if policy else 0
+        mapped_items = []
+        for item in items:
+
+            content = item.get("content", None)
+            if item["type"] == "environment" and policy and content:
+                results_left -= 1
+                content = policy.render(content, results_left, item.get("artifact"))
+            else:
+                content = render(content) if content else dumps(item)
+
+            if item["type"] == "assistant":
+                mapped_items.append({"role": "assistant", "content": content})
+            elif item["type"] == "environment":
+                mapped_items.append({"role": "assistant", "content": content})
+            else:
+                mapped_items.append({"role": "user", "content": content})
+
+        return mapped_items
+
+    def render_goals(self, goals: List[Goal]) -> List:
+        """
+        Memoized format_goals. Goals are frozen dataclasses, so the tuple of goals
+        is a complete cache key and the same message objects are returned each time.
+        """
+        key = tuple(goals)
+        cache = self.__dict__.setdefault("_goals_cache", {})
+        rendered = cache.get(key)
+        if rendered is None:
+            if len(cache) >= RENDER_CACHE_SIZE:
+                cache.clear()
+            rendered = cache[key] = self.format_goals(goals)
+        return rendered
+
+    def render_actions(self, actions: List[Action], actions_version: int = None) -> List:
+        """
+        Memoized format_actions keyed on the ActionRegistry version the actions
+        came from (any hashable, e.g. a version plus the names of a routed subset).
+        Without a version the actions are rendered every time.
+        """
+        if actions_version is None:
+            return self.format_actions(actions)
+        cache = self.__dict__.setdefault("_actions_cache", {})
+        rendered = cache.get(actions_version)
+        if rendered is None:
+            if len(cache) >= RENDER_CACHE_SIZE:
+                cache.clear()
+            rendered = cache[actions_version] = self.format_actions(actions)
+        return rendered
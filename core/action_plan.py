@@ -0,0 +1,159 @@
+import re
+from typing import Any, Dict, List
+
+from core.action import Action
+
+PLAN_TOOL_NAME = "execute_plan"
+
+# "$id" or "$id.key" as a whole argument value passes the step's output through unchanged;
+# "${id}" or "${id.key}" inside a longer string is replaced by the output's text
+_WHOLE_REFERENCE = re.compile(r"^\$(\w+)((?:\.\w+)*)$")
+_INLINE_REFERENCE = re.compile(r"\$\{(\w+)((?:\.\w+)*)\}")
+
+PLAN_DESCRIPTION = (
+    "Run several tool calls in one turn as a dependency graph. Steps that do not "
+    "depend on each other run in parallel. An argument value \"$<id>\" is replaced "
+    "by the output of step <id> (\"$<id>.<key>\" picks a key of a dict output), and "
+    "\"${<id>}\" inside a longer string is replaced by that output's text. Steps "
+    "that reference another step wait for it; list other ordering constraints in "
+    "depends_on. Use this when you already know the next few calls, e.g. read "
+    "three files and then review them."
+)
+
+PLAN_PARAMETERS = {
+    "type": "object",
+    "properties": {
+        "steps": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "string"},
+                    "tool": {"type": "string"},
+                    "args": {"type": "object"},
+                    "depends_on": {"type": "array", "items": {"type": "string"}}
+                },
+                "required": ["id", "tool", "args"]
+            }
+        }
+    },
+    "required": ["steps"]
+}
+
+
+def _not_dispatchable(**_):
+    raise RuntimeError(f"'{PLAN_TOOL_NAME}' is run by the agent's environment, not called directly")
+
+
+def plan_action() -> Action:
+    """The pseudo-action offered to the LLM when an agent accepts multi-step plans."""
+    return Action(
+        name=PLAN_TOOL_NAME,
+        function=_not_dispatchable,
+        description=PLAN_DESCRIPTION,
+        parameters=PLAN_PARAMETERS
+    )
+
+
+def is_plan_invocation(invocation: dict) -> bool:
+    return invocation.get("tool") == PLAN_TOOL_NAME
+
+
+def normalize_plan(steps: List[dict], action_registry=None) -> List[dict]:
+    """
+    Validate a plan and make every step's dependencies explicit.
+
+    Dependencies come from depends_on plus every step referenced in the
+    step's arguments.
+
+    Args:
+        steps: The plan's steps as produced by the LLM
+        action_registry: If given, every step's tool must be registered in it
+
+    Returns:
+        The steps as {"id", "tool", "args", "depends_on"} dicts, in plan order
+
+    Raises:
+        ValueError: If the plan is malformed, names an unknown tool or step,
+            or has a dependency cycle
+    """
+    from core.dag import topological_order
+
+    if not isinstance(steps, list) or not steps:
+        raise ValueError("A plan must be a non-empty list of steps")
+
+    normalized = []
+    for position, step in enumerate(steps):
+        if not isinstance(step, dict) or not isinstance(step.get("tool"), str):
+            raise ValueError(f"Plan step {position} must be an object with a 'tool' name")
+        step_id = str(step.get("id") or f"step{position + 1}")
+        args = step.get("args") or {}
+        if not isinstance(args, dict):
+            raise ValueError(f"Plan step '{step_id}': args must be an object")
+        if step["tool"] == PLAN_TOOL_NAME:
+            raise ValueError(f"Plan step '{step_id}': plans cannot be nested")
+        if action_registry is not None and action_registry.get_action(step["tool"]) is None:
+            raise ValueError(f"Plan step '{step_id}': unknown tool '{step['tool']}'")
+        normalized.append({"id": step_id, "tool": step["tool"], "args": args,
+                           "depends_on": list(step.get("depends_on") or [])})
+
+    ids = [step["id"] for step in normalized]
+    if len(set(ids)) != len(ids):
+        raise ValueError("Plan step ids must be unique")
+
+    known = set(ids)
+    for step in normalized:
+        for ref in _references(step["args"], known):
+            if ref not in step["depends_on"]:
+                step["depends_on"].append(ref)
+
+    topological_order({step["id"]: step["depends_on"] for step in normalized})
+    return normalized
+
+
+def resolve_references(value: Any, outputs: Dict[str, Any]) -> Any:
+    """Replace step references in an argument value with the referenced outputs."""
+    if isinstance(value, str):
+        whole = _WHOLE_REFERENCE.match(value)
+        if whole and whole.group(1) in outputs:
+            return _lookup(outputs[whole.group(1)], whole.group(2))
+
+        def substitute(match):
+            if match.group(1) not in outputs:
+                return match.group(0)
+            found = _lookup(outputs[match.group(1)], match.group(2))
+            return found if isinstance(found, str) else str(found)
+
+        return _INLINE_REFERENCE.sub(substitute, value)
+    if isinstance(value, dict):
+        return {k: resolve_references(v, outputs) for k, v in value.items()}
+    if isinstance(value, list):
+        return [resolve_references(v, outputs) for v in value]
+    return value
+
+
+def _lookup(output: Any, path: str) -> Any:
+    for key in filter(None, path.split(".")):
+        if isinstance(output, dict) and key in output:
+            output = output[key]
+        elif isinstance(output, list) and key.isdigit() and int(key) < len(output):
+            output = output[int(key)]
+        else:
+            raise ValueError(f"Output has no '{key}' to reference")
+    return output
+
+
+def _references(value: Any, known: set):
+    if isinstance(value, str):
+        whole = _WHOLE_REFERENCE.match(value)
+        if whole and whole.group(1) in known:
+            yield whole.group(1)
+        for match in _INLINE_REFERENCE.finditer(value):
+            if match.group(1) in known:
+                yield match.group(1)
+    elif isinstance(value, dict):
+        for v in value.values():
+            yield from _references(v, known)
+    elif isinstance(value, list):
+        for v in value:
+            yield from _references(v, known)
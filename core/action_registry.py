@@ -1,15 +1,35 @@
+import itertools
 from typing import List
 from core.action import Action
+
+# Versions are drawn from one process-wide counter, so a version number
+# identifies both a registry and the state it was in.
+_versions = itertools.count(1)
+
+
+class UnknownToolError(ValueError):
+    """Raised when the LLM names a tool that is not in the registry."""
+
+    def __init__(self, name: str, available: List[str]):
+        super().__init__(f"Unknown tool '{name}'. Available tools: {', '.join(sorted(available)) or 'none'}")
+        self.name = name
+        self.available = available
+
+
 class ActionRegistry:
     def __init__(self):
         self.actions = {}
+        self.version = next(_versions)
 
     def register(self, action: Action):
+        # Work out dependency injection now rather than on every dispatch
+        action.injection_plan
         self.actions[action.name] = action
+        self.version = next(_versions)
 
     def get_action(self, name: str) -> [Action, None]: # type: ignore
         return self.actions.get(name, None)
 
     def get_actions(self) -> List[Action]:
         """Get all registered actions"""
-        return list(self.actions.values())
\ No newline at end of file
+        return list(self.actions.values())
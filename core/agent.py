@@ -1,13 +1,16 @@
-import json
+import traceback
 from typing import Callable, List
 from core.action_language import AgentLanguage
-from core.action_registry import ActionRegistry
+from core.action_plan import is_plan_invocation, normalize_plan, plan_action
+from core.action_registry import ActionRegistry, UnknownToolError
 from core.capability import Capability
 from core.environment import Environment
 
 from core.goal import Goal
 from core.memory import Memory
 from core.prompt import Prompt
+from core.serialization import LazyJson
+from core.tool_router import ToolRouter
 
 
 class Agent:
@@ -16,30 +19,102 @@ class Agent:
                  agent_language: AgentLanguage,
                  action_registry: ActionRegistry,
                  generate_response: Callable[[Prompt], str],
-                 environment: Environment):
+                 environment: Environment,
+                 max_parse_retries: int = 2,
+                 tool_router: ToolRouter = None,
+                 allow_plans: bool = False):
         """
         Initialize an agent with its core GAME components
+
+        Args:
+            allow_plans: Also offer the execute_plan action, letting the LLM
+                return several dependent tool calls in one turn (see core.action_plan)
         """
         self.goals = goals
         self.generate_response = generate_response
         self.agent_language = agent_language
         self.actions = action_registry
         self.environment = environment
+        self.max_parse_retries = max_parse_retries
+        self.tool_router = tool_router
+        self.plan_action = plan_action() if allow_plans else None
 
     def construct_prompt(self, goals: List[Goal], memory: Memory, actions: ActionRegistry) -> Prompt:
         """Build prompt with memory context"""
+        offered = actions.get_actions()
+        version = actions.version
+        if self.tool_router:
+            offered = self.tool_router.select(offered, memory)
+            # Rendered schemas are memoized per distinct subset of the registry
+            version = (version, tuple(action.name for action in offered))
+        if self.plan_action:
+            offered = offered + [self.plan_action]
+            version = (version, self.plan_action.name)
+
         return self.agent_language.construct_prompt(
-            actions=actions.get_actions(),
+            actions=offered,
             environment=self.environment,
             goals=goals,
-            memory=memory
+            memory=memory,
+            actions_version=version
         )
 
     def get_action(self, response):
         invocation = self.agent_language.parse_response(response)
+        if self.plan_action and is_plan_invocation(invocation):
+            # Reject a malformed plan here so the LLM is asked to fix it
+            invocation["args"]["steps"] = normalize_plan(invocation["args"].get("steps"), self.actions)
+            return self.plan_action, invocation
         action = self.actions.get_action(invocation["tool"])
+        if action is None:
+            raise UnknownToolError(invocation["tool"], [a.name for a in self.actions.get_actions()])
         return action, invocation
 
+    def unknown_tool_result(self, name: str) -> dict:
+        """The environment result recorded for a call of a tool that does not exist."""
+        error = UnknownToolError(name, [a.name for a in self.actions.get_actions()])
+        return {"tool_executed": False, "error": str(error)}
+
+    def decide(self, prompt: Prompt, response: str):
+        """
+        Parse the response into an action. Malformed output is repaired locally by
+        the agent language; the LLM is re-asked only when nothing can be recovered,
+        the tool does not exist or the arguments do not match the tool's schema.
+
+        Returns:
+            (action, invocation, response) where response is the one that parsed;
+            action is None if the last attempt still named an unknown tool
+        """
+        for retries_left in range(self.max_parse_retries, -1, -1):
+            try:
+                action, invocation = self.get_action(response)
+                if action and retries_left:
+                    # Bad arguments are sent back for correction instead of wasting an
+                    # iteration; on the last attempt the environment reports them
+                    action.validate_args(invocation.get("args", {}))
+                return action, invocation, response
+            except Exception as e:
+                if retries_left == 0:
+                    if isinstance(e, UnknownToolError):
+                        # run() records the error as the call's result
+                        return None, self.agent_language.parse_response(response), response
+                    invocation = self.agent_language.handle_unparseable_response(response, e)
+                    return self.actions.get_action(invocation["tool"]), invocation, response
+                print(f"Failed to parse response ({e}), asking again...")
+                prompt = self.agent_language.adapt_prompt_after_parsing_error(
+                    prompt, response, traceback.format_exc(), e, retries_left
+                )
+                response = self.prompt_llm_for_action(prompt)
+
+    def plan_terminated(self, steps: List[dict], result: dict) -> bool:
+        """A plan ends the run if one of its terminal tools completed."""
+        outcomes = result.get("plan", {})
+        return any(
+            self.actions.get_action(step["tool"]).terminal
+            and outcomes.get(step["id"], {}).get("status") == "ok"
+            for step in steps
+        )
+
     def should_terminate(self, response: str) -> bool:
         action_def, _ = self.get_action(response)
         return action_def.terminal
@@ -51,9 +126,16 @@ class Agent:
         """
         Update memory with the agent's decision and the environment's response.
         """
+        # Serialized once, and the text reused by every prompt the result is rendered into
+        environment = {"type": "environment", "content": LazyJson(result)}
+        policy = getattr(self.agent_language, "result_policy", None)
+        artifact = policy.record(environment["content"]) if policy else None
+        if artifact:
+            # Cited when later prompts elide the result
+            environment["artifact"] = artifact
         new_memories = [
             {"type": "assistant", "content": response},
-            {"type": "environment", "content": json.dumps(result)}
+            environment
         ]
         for m in new_memories:
             memory.add_memory(m)
@@ -79,17 +161,25 @@ class Agent:
             print(f"Agent Decision: {response}")
 
             # Determine which action the agent wants to execute
-            action, invocation = self.get_action(response)
-
-            # Execute the action in the environment
-            result = self.environment.execute_action(action, invocation["args"])
-           
+            action, invocation, response = self.decide(prompt, response)
+            steps = invocation["args"]["steps"] if self.plan_action and action is self.plan_action else None
+            if self.tool_router:
+                for tool in [step["tool"] for step in steps] if steps else [invocation["tool"]]:
+                    self.tool_router.record_invocation(tool)
+
+            # Execute the action (or every step of a plan) in the environment
+            if steps:
+                result = self.environment.execute_plan(steps, self.actions)
+            elif action is None:
+                result = self.unknown_tool_result(invocation["tool"])
+            else:
+                result = self.environment.execute_action(action, invocation["args"])
 
             # Update the agent's memory with information about what happened
             self.update_memory(memory, response, result)
 
             # Check if the agent has decided to terminate
-            if self.should_terminate(response):
+            if action and action.terminal or steps and self.plan_terminated(steps, result):
                 break
 
         return memory
\ No newline at end of file
@@ -2,6 +2,16 @@ from core.json_prompt import prompt_llm_for_json
 from core.memory import Memory
 from core.tool_decorator import register_tool
 from core.action_context import ActionContext
+from core.serialization import LazyJson
+
+
+def _result(item: dict, default: str):
+    """
+    A memory item's content as the caller sees it. Environment results are
+    kept in memory as LazyJson; they are handed out as their JSON text.
+    """
+    content = item.get("content", default)
+    return str(content) if isinstance(content, LazyJson) else content
 
 @register_tool()
 def call_agent(action_context: ActionContext, 
@@ -50,7 +60,7 @@ def call_agent(action_context: ActionContext,
             return {
                 "success": True,
                 "agent": agent_name,
-                "result": last_memory.get("content", "No result content")
+                "result": _result(last_memory, "No result content")
             }
         else:
             return {
@@ -95,7 +105,7 @@ def call_agent_with_reflection(action_context: ActionContext,
         })
     
     return {
-        "result": result_memory.items[-1].get("content", "No result"),
+        "result": _result(result_memory.items[-1], "No result"),
         "memories_added": len(result_memory.items)
     }
 
@@ -118,7 +128,7 @@ def hand_off_to_agent(action_context: ActionContext,
     )
     
     return {
-        "result": result_memory.items[-1].get("content", "No result"),
+        "result": _result(result_memory.items[-1], "No result"),
         "memory_id": id(result_memory)
     }
 
@@ -208,7 +218,7 @@ Explain your selection process."""
         current_memory.add_memory(memory_item)
     
     return {
-        "result": result_memory.items[-1].get("content", "No result"),
+        "result": _result(result_memory.items[-1], "No result"),
         "shared_memories": len(filtered_memory.items),
         "selection_reasoning": selection["reasoning"]
     }
\ No newline at end of file
@@ -7,6 +7,7 @@ from core.environment import Environment
 from core.goal import Goal
 from core.memory import Memory
 from core.prompt import Prompt
+from core.response_parser import parse_tool_invocation
 
 
 class AgentJsonActionLanguage(AgentLanguage):
@@ -36,50 +37,28 @@ class AgentJsonActionLanguage(AgentLanguage):
         ]
 
     def parse_response(self, response: str) -> dict:
-        """Extract and parse the action block"""
-        try:
-            start_marker = "```action"
-            end_marker = "```"
-            
-            stripped_response = response.strip()
-            start_index = stripped_response.find(start_marker)
-            end_index = stripped_response.rfind(end_marker)
-            json_str = stripped_response[
-                start_index + len(start_marker):end_index
-            ].strip()
-            
-            return json.loads(json_str)
-        except Exception as e:
-            print(f"Failed to parse response: {str(e)}")
-            raise e
+        """Extract and parse the action block, repairing malformed JSON locally"""
+        return parse_tool_invocation(response)
         
     def construct_prompt(self,
                          actions: List[Action],
                          environment: Environment,
                          goals: List[Goal],
-                         memory: Memory) -> Prompt:
+                         memory: Memory,
+                         actions_version: int = None) -> Prompt:
         """Build prompt with memory context"""
         # The AgentLanguage decides how to present each component to the LLM
         prompt = []
         
         # Transform goals into instructions
-        prompt += self.format_goals(goals)
+        prompt += self.render_goals(goals)
         
         # Transform available actions into tool descriptions
-        prompt += self.format_actions(actions)
+        prompt += self.render_actions(actions, actions_version)
         
         # Transform memory into conversation context
         prompt += self.format_memory(memory)
         
-        def parse_response(self, json_str):
-            print("Raw agent response:", repr(json_str))  # Debug print
-            if not json_str or not json_str.strip():
-                raise ValueError("Agent response is empty or whitespace.")
-            try:
-                return json.loads(json_str)
-            except Exception as e:
-                raise e
-        
         return Prompt(messages=prompt)
     
     def format_goals(self, goals: List[Goal]) -> List:
@@ -90,25 +69,3 @@ class AgentJsonActionLanguage(AgentLanguage):
         return [
             {"role": "system", "content": goal_instructions}
         ]
-
-    def format_memory(self, memory: Memory) -> List:
-        """Generate response from language model"""
-        # Map all environment results to a role:user messages
-        # Map all assistant messages to a role:assistant messages
-        # Map all user messages to a role:user messages
-        items = memory.get_memories()
-        mapped_items = []
-        for item in items:
-
-            content = item.get("content", None)
-            if not content:
-                content = json.dumps(item, indent=4)
-
-            if item["type"] == "assistant":
-                mapped_items.append({"role": "assistant", "content": content})
-            elif item["type"] == "environment":
-                mapped_items.append({"role": "assistant", "content": content})
-            else:
-                mapped_items.append({"role": "user", "content": content})
-
-        return mapped_items
@@ -8,6 +8,7 @@ from core.environment import Environment
 from core.goal import Goal
 from core.memory import Memory
 from core.prompt import Prompt
+from core.response_parser import parse_tool_invocation
 
 
 class AgentTextActionLanguage(AgentLanguage):
@@ -24,28 +25,6 @@ class AgentTextActionLanguage(AgentLanguage):
             {"role": "system", "content": goal_instructions}
         ]
 
-    def format_memory(self, memory: Memory) -> List:
-        """Generate response from language model"""
-        # Map all environment results to a role:user messages
-        # Map all assistant messages to a role:assistant messages
-        # Map all user messages to a role:user messages
-        items = memory.get_memories()
-        mapped_items = []
-        for item in items:
-
-            content = item.get("content", None)
-            if not content:
-                content = json.dumps(item, indent=4)
-
-            if item["type"] == "assistant":
-                mapped_items.append({"role": "assistant", "content": content})
-            elif item["type"] == "environment":
-                mapped_items.append({"role": "assistant", "content": content})
-            else:
-                mapped_items.append({"role": "user", "content": content})
-
-        return mapped_items
-
     def format_actions(self, actions: List[Action]) -> [List,List]: # type: ignore
         """Generate response from language model"""
 
@@ -67,33 +46,24 @@ class AgentTextActionLanguage(AgentLanguage):
                          actions: List[Action],
                          environment: Environment,
                          goals: List[Goal],
-                         memory: Memory) -> Prompt:
+                         memory: Memory,
+                         actions_version: int = None) -> Prompt:
 
         prompt = []
-        prompt += self.format_goals(goals)
+        prompt += self.render_goals(goals)
         prompt += self.format_memory(memory)
 
-        tools = self.format_actions(actions)
+        tools = self.render_actions(actions, actions_version)
 
         return Prompt(messages=prompt, tools=tools)
 
-    def adapt_prompt_after_parsing_error(self,
-                                         prompt: Prompt,
-                                         response: str,
-                                         traceback: str,
-                                         error: Any,
-                                         retries_left: int) -> Prompt:
-
-        return prompt
-
     def parse_response(self, response: str) -> dict:
-        """Parse LLM response into structured format by extracting the ```json block"""
-
-        try:
-            return json.loads(response)
-
-        except Exception as e:
-            return {
-                "tool": "terminate",
-                "args": {"message":response}
-            }
\ No newline at end of file
+        """Parse LLM response into structured format, repairing malformed JSON locally"""
+        return parse_tool_invocation(response)
+
+    def handle_unparseable_response(self, response: str, error: Exception) -> dict:
+        """Once re-asking is exhausted, treat the plain-text response as the final message"""
+        return {
+            "tool": "terminate",
+            "args": {"message": response}
+        }
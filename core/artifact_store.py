@@ -0,0 +1,187 @@
+import hashlib
+import os
+import tempfile
+import zlib
+from typing import Union
+
+from core.ranged_reader import DEFAULT_MAX_BYTES, read_range
+from core.tool_decorator import register_tool
+
+ARTIFACT_DIR = os.getenv("ARTIFACT_DIR", ".artifacts")
+
+# Read chunk used when materializing a compressed artifact for memory mapping
+_CHUNK = 1024 * 1024
+
+
+class ArtifactStore:
+    """
+    Content-addressed local store for large tool outputs.
+
+    Artifacts are keyed by the SHA-256 of their bytes, so storing the same
+    content twice is free. They are kept zlib-compressed under objects/. The
+    first ranged read of an artifact decompresses it, chunk by chunk, into a
+    cache file under raw/, which is then memory-mapped: reads only copy the
+    requested slice and the pages are shared through the OS page cache rather
+    than held in the process heap.
+    """
+
+    def __init__(self, root: str = None):
+        self.root = os.path.abspath(root or ARTIFACT_DIR)
+
+    def put(self, content: Union[str, bytes], summary: str = None) -> dict:
+        """
+        Store content and return a small handle describing it.
+
+        Returns:
+            {"artifact": <sha256>, "size": <bytes>, "lines": <count>, "summary": <text>}
+        """
+        data = content.encode("utf-8") if isinstance(content, str) else content
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            self._write_atomic(path, zlib.compress(data, 6))
+
+        return {
+            "artifact": digest,
+            "size": len(data),
+            "lines": data.count(b"\n") + (0 if not data or data.endswith(b"\n") else 1),
+            "summary": summary if summary is not None else summarize(data),
+        }
+
+    def exists(self, artifact: str) -> bool:
+        return os.path.exists(self._object_path(self._digest(artifact)))
+
+    def read(self, artifact, start: int = None, end: int = None,
+             start_line: int = None, end_line: int = None,
+             max_bytes: int = DEFAULT_MAX_BYTES) -> str:
+        """Read a byte and/or line range of an artifact (a digest or a handle)."""
+        return read_range(self.raw_path(artifact), start=start, end=end,
+                          start_line=start_line, end_line=end_line, max_bytes=max_bytes)
+
+    def get(self, artifact) -> str:
+        """Return the whole artifact as text."""
+        return self.read(artifact, max_bytes=None)
+
+    def raw_path(self, artifact) -> str:
+        """Path of the decompressed copy of an artifact, materializing it if needed."""
+        digest = self._digest(artifact)
+        raw = os.path.join(self.root, "raw", digest[:2], digest[2:])
+        if os.path.exists(raw):
+            return raw
+
+        source = self._object_path(digest)
+        if not os.path.exists(source):
+            raise KeyError(f"Unknown artifact: {digest}")
+
+        os.makedirs(os.path.dirname(raw), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(raw))
+        try:
+            decompressor = zlib.decompressobj()
+            with open(source, "rb") as src, os.fdopen(fd, "wb") as dst:
+                for chunk in iter(lambda: src.read(_CHUNK), b""):
+                    dst.write(decompressor.decompress(chunk))
+                dst.write(decompressor.flush())
+            os.replace(tmp, raw)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return raw
+
+    def set_ref(self, key: str, artifact) -> None:
+        """
+        Record that key (e.g. a hash of the inputs that produced an artifact)
+        resolves to artifact. Refs live under refs/, one small file each.
+        """
+        self._write_atomic(self._ref_path(key), self._digest(artifact).encode("ascii"))
+
+    def get_ref(self, key: str):
+        """The artifact id a key resolves to, or None if it is unknown or its artifact is gone."""
+        try:
+            with open(self._ref_path(key), "rb") as f:
+                digest = f.read().decode("ascii")
+        except FileNotFoundError:
+            return None
+        return digest if self.exists(digest) else None
+
+    def _ref_path(self, key: str) -> str:
+        key = hashlib.sha256(key.encode("utf-8")).hexdigest() if len(key) != 64 else key
+        return os.path.join(self.root, "refs", key[:2], key[2:])
+
+    def _digest(self, artifact) -> str:
+        digest = artifact["artifact"] if isinstance(artifact, dict) else str(artifact)
+        digest = digest.split(":", 1)[-1].strip()
+        if len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest):
+            raise KeyError(f"Not an artifact id: {artifact!r}")
+        return digest
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest[2:] + ".z")
+
+    def _write_atomic(self, path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+
+def summarize(data: bytes, max_chars: int = 240) -> str:
+    """A short preview of an artifact: its first non-empty lines."""
+    text = data[:max_chars * 4].decode("utf-8", errors="replace")
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    preview = " / ".join(lines)
+    return preview[:max_chars] + ("..." if len(preview) > max_chars else "")
+
+
+_default_store = None
+
+
+def get_artifact_store() -> ArtifactStore:
+    global _default_store
+    if _default_store is None:
+        _default_store = ArtifactStore()
+    return _default_store
+
+
+def set_artifact_store(store: ArtifactStore):
+    global _default_store
+    _default_store = store
+
+
+def store_artifact(content: Union[str, bytes], summary: str = None) -> dict:
+    """Put content in the default artifact store and return its handle."""
+    return get_artifact_store().put(content, summary=summary)
+
+
+# Also tagged feature_development: develop_feature hands back artifact handles
+@register_tool(tags=["artifacts", "feature_development"])
+def read_artifact(artifact: str,
+                  start_line: int = None,
+                  end_line: int = None,
+                  start: int = None,
+                  end: int = None) -> str:
+    """Reads part of a stored artifact referenced by a handle returned from another tool.
+
+    Large tool outputs are stored as artifacts and only a handle with a summary
+    is kept in memory. Use this tool to read the parts you need; request line
+    ranges (1-based, inclusive) or byte ranges rather than the whole artifact.
+    At most 64 KB is returned per call.
+
+    Args:
+        artifact: The artifact id from the handle
+        start_line: First line to read
+        end_line: Last line to read
+        start: First byte offset to read
+        end: Byte offset to stop reading at
+
+    Returns:
+        The requested part of the artifact
+    """
+    return get_artifact_store().read(artifact, start=start, end=end,
+                                     start_line=start_line, end_line=end_line)
@@ -1,17 +1,137 @@
 import re
 import os
+import io
+import time
+from typing import Iterable, Iterator, List, NamedTuple, Union
 
-from core.file_operations import write_to_file
+from core.file_operations import BulkWriter
 
-def parse_markdown_and_create_structure(markdown_content, output_base_dir="generated_project"):
+
+class CodeFile(NamedTuple):
+    """A generated source file found in markdown."""
+    directory: str
+    filename: str
+    content: str
+
+
+# A fence line: ``` optionally followed by a language tag (```java, ```c++, ```)
+_FENCE = re.compile(r'^\s*```([^`]*)$')
+_HEADER = re.compile(r'^\s*(filename|directory)\s*:\s*(.*?)\s*$', re.IGNORECASE)
+
+
+class CodeBlockParser:
+    """
+    Single-pass, line-oriented parser for code blocks of the form
+
+        ```java
+        filename: Main.java
+        directory: src/main/java
+        <code>
+        ```
+
+    The language tag is optional, the filename/directory lines may come in either
+    order (directory may be left out), and CRLF line endings are accepted. Each
+    line is looked at once, so time is linear in the input and only the current
+    block is held in memory. Blocks without a filename line are skipped, as is a
+    block whose closing fence never arrives.
+    """
+
+    def __init__(self):
+        self._partial = ""
+        self._state = "text"  # text -> header -> code -> text, or header -> skip -> text
+        self._header = {}
+        self._code = []
+
+    def feed(self, chunk: str) -> List[CodeFile]:
+        """Parse a chunk of text; returns the blocks it completed."""
+        lines = (self._partial + chunk).split("\n")
+        self._partial = lines.pop()
+        found = []
+        for line in lines:
+            block = self.feed_line(line)
+            if block is not None:
+                found.append(block)
+        return found
+
+    def close(self) -> List[CodeFile]:
+        """Parse the final line, if it had no line break."""
+        line, self._partial = self._partial, ""
+        block = self.feed_line(line) if line else None
+        return [block] if block is not None else []
+
+    def feed_line(self, line: str):
+        """Parse one line (with or without its line ending); returns a CodeFile when a block closes."""
+        line = line.rstrip("\r\n")
+        state = self._state
+
+        if state == "code":
+            if line.lstrip().startswith("```") and not line.strip().strip("`"):
+                self._state = "text"
+                return CodeFile(self._header.get("directory", ""), self._header["filename"],
+                                "\n".join(self._code).strip())
+            self._code.append(line)
+            return None
+
+        if state == "text":
+            if "```" in line and _FENCE.match(line):
+                self._state = "header"
+                self._header = {}
+            return None
+
+        if state == "header":
+            header = _HEADER.match(line)
+            if header:
+                self._header[header.group(1).lower()] = header.group(2)
+                return None
+            if "filename" in self._header:
+                self._state = "code"
+                self._code = []
+                return self.feed_line(line)
+            state = self._state = "skip"
+
+        # skip: a block that is not a file, up to its closing fence
+        if line.lstrip().startswith("```") and not line.strip().strip("`"):
+            self._state = "text"
+        return None
+
+
+def iter_code_blocks(source: Union[str, io.IOBase, Iterable[str]]) -> Iterator[CodeFile]:
+    """
+    Yield the code blocks in markdown as (directory, filename, content) records.
+
+    Args:
+        source: The markdown as a string, an open text file, or an iterable of
+            text chunks of any size, e.g. tokens streamed from an LLM
+    """
+    parser = CodeBlockParser()
+    if isinstance(source, str):
+        source = io.StringIO(source)
+    if isinstance(source, io.IOBase):
+        # Files iterate by line, so each piece is a complete line
+        for line in source:
+            block = parser.feed_line(line)
+            if block is not None:
+                yield block
+        return
+    for chunk in source:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+def parse_markdown_and_create_structure(markdown_content, output_base_dir="generated_project",
+                                        source="default", prune=False):
     """
     Parses a markdown file containing code blocks with filename: and directory: tags,
     creates directories, and writes code to respective files.
-    
+
     Args:
-        markdown_content (str): Content of the markdown file
+        markdown_content (str): Content of the markdown file, or an open file or
+            stream of text chunks (see iter_code_blocks)
         output_base_dir (str): Base directory where project structure will be created
-    
+        source (str): Name the files are recorded under in the output directory's
+            manifest; unchanged files are not rewritten (see BulkWriter)
+        prune (bool): Delete files this source generated last time but not now
+
     Returns:
         list: List of created file paths
     """
@@ -22,45 +142,129 @@ def parse_markdown_and_create_structure(markdown_content, output_base_dir="gener
         return []
     print(f"Creating project structure in: {abs_output_base_dir}")
     os.makedirs(abs_output_base_dir,mode=0o755, exist_ok=True)
-    
-    created_files = []
-    
-    
-    
-    # Extract code blocks and parse filename and directory tags
-    code_block_pattern = r'```(?:\w+)\nfilename: (.+?)\ndirectory: (.+?)\n(.*?)```'
-    code_blocks = re.finditer(code_block_pattern, markdown_content, re.DOTALL)
-    
-    for block in code_blocks:
-        filename = block.group(1).strip()
-        directory = block.group(2).strip()
-        code_content = block.group(3).strip()
-        print(f"Found code block for file: {filename} in directory: {directory}")
-        # Construct full filepath
-        full_dir_path = os.path.join(abs_output_base_dir, directory)
-        full_filepath = os.path.join(full_dir_path, filename)
-        # Create file if it has a valid extension
-        created_files.append(write_to_file(full_filepath, code_content))
-       
+
+    with BulkWriter(abs_output_base_dir, source=source, prune=prune) as writer:
+        for directory, filename, code_content in iter_code_blocks(markdown_content):
+            print(f"Found code block for file: {filename} in directory: {directory}")
+            writer.submit(os.path.join(directory, filename), code_content)
+
+    created_files = list(writer.manifest["files"])
     if not created_files:
         print("No valid code blocks or project structure found in the markdown")
-    
+
     return created_files
 
+
+class CodeBlockStream:
+    """
+    Counterpart of parse_markdown_and_create_structure for text that arrives in
+    pieces, e.g. an LLM response being streamed: feed it chunks as they come and
+    each file is queued for writing as soon as the fence of its code block closes.
+    source and prune are as for parse_markdown_and_create_structure.
+    """
+
+    def __init__(self, output_base_dir="generated_project", source="default", prune=False):
+        self.base_dir = os.path.abspath(output_base_dir)
+        self.source = source
+        self.prune = prune
+        self.created_files = []
+        self.manifest = None
+        self._parser = CodeBlockParser()
+        self._writer = None
+
+    def feed(self, chunk: str):
+        """Process a chunk of text; complete lines are handled right away."""
+        for block in self._parser.feed(chunk):
+            self._write(block)
+
+    def close(self, complete=True):
+        """
+        Handle the final line and wait for the writes. A block whose fence never closed is not written.
+
+        Args:
+            complete: False if the text was cut short (e.g. the response failed
+                part way), so files missing from it are not treated as removed
+        """
+        for block in self._parser.close():
+            self._write(block)
+        if self._writer is None:
+            print("No valid code blocks or project structure found in the markdown")
+            return self.created_files
+        self.manifest = self._writer.close(complete)
+        self.created_files = list(self.manifest["files"])
+        return self.created_files
+
+    def _write(self, block: CodeFile):
+        print(f"Found code block for file: {block.filename} in directory: {block.directory}")
+        if self._writer is None:
+            print(f"Creating project structure in: {self.base_dir}")
+            self._writer = BulkWriter(self.base_dir, source=self.source, prune=self.prune)
+        self._writer.submit(os.path.join(block.directory, block.filename), block.content)
+
+def _generate_markdown(path: str, size_mb: int, crlf: bool = False):
+    """Write a synthetic LLM-style document of about size_mb: prose, tagged and untagged blocks."""
+    newline = "\r\n" if crlf else "\n"
+    body = newline.join(f"    public int method{i}(int x) {{ return x * {i}; }}" for i in range(40))
+    target = size_mb * 1024 * 1024
+    written, n = 0, 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        while written < target:
+            tag = ("java", "", "typescript")[n % 3]
+            piece = (f"Here is file number {n}, which implements part of the feature.{newline}{newline}"
+                     f"```{tag}{newline}filename: File{n}.java{newline}directory: src/module{n % 50}{newline}"
+                     f"public class File{n} {{{newline}{body}{newline}}}{newline}```{newline}{newline}")
+            f.write(piece)
+            written += len(piece)
+            n += 1
+    return n
+
+
+def _benchmark(sizes_mb=(10, 50, 100)):
+    """Throughput of the line parser vs. the former DOTALL regex, on generated markdown."""
+    import tempfile
+    old_pattern = re.compile(r'```(?:\w+)\nfilename: (.+?)\ndirectory: (.+?)\n(.*?)```', re.DOTALL)
+    with tempfile.TemporaryDirectory() as tmp:
+        for size_mb in sizes_mb:
+            for crlf in (False, True):
+                path = os.path.join(tmp, f"bench_{size_mb}.md")
+                blocks = _generate_markdown(path, size_mb, crlf)
+                start = time.perf_counter()
+                with open(path, encoding="utf-8", newline="") as f:
+                    found = sum(1 for _ in iter_code_blocks(f))
+                parsed = time.perf_counter() - start
+
+                with open(path, encoding="utf-8", newline="") as f:
+                    text = f.read()
+                start = time.perf_counter()
+                old_found = sum(1 for _ in old_pattern.finditer(text))
+                regex = time.perf_counter() - start
+                print(f"{size_mb:>4} MB {'CRLF' if crlf else 'LF  '}  {blocks} blocks | "
+                      f"line parser {found} found in {parsed:.2f}s ({size_mb / parsed:.0f} MB/s) | "
+                      f"regex {old_found} found in {regex:.2f}s")
+
+
 # Example usage
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Create project files from the code blocks in a markdown file.")
+    parser.add_argument("markdown_file", nargs="?", default="implementation.md")
+    parser.add_argument("--output-dir", default="generated_project")
+    parser.add_argument("--benchmark", nargs="*", type=int, metavar="MB",
+                        help="Time the parser on generated markdown of these sizes instead (default 10 50 100)")
+    options = parser.parse_args()
+
+    if options.benchmark is not None:
+        _benchmark(options.benchmark or (10, 50, 100))
+        raise SystemExit(0)
+
     # Read the markdown content
     try:
-        with open('implementation.md', 'r', encoding='utf-8') as f:
-            markdown_content = f.read()
+        with open(options.markdown_file, 'r', encoding='utf-8') as f:
+            # Create project structure and files
+            created = parse_markdown_and_create_structure(f, options.output_dir)
     except FileNotFoundError:
-        print("Error: implementation.md not found in the current directory")
+        print(f"Error: {options.markdown_file} not found in the current directory")
         exit(1)
-    
-    # Create project structure and files
-    created = parse_markdown_and_create_structure(markdown_content)
-    print("\nCreated files:", created)
 
-
-
-    
\ No newline at end of file
+    print("\nCreated files:", created)
@@ -0,0 +1,89 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List
+
+
+def topological_order(dependencies: Dict[str, List[str]]) -> List[str]:
+    """
+    Order nodes so every node comes after its dependencies.
+
+    Raises:
+        ValueError: On a dependency that is not a node, or on a cycle
+    """
+    for node, deps in dependencies.items():
+        for dep in deps:
+            if dep not in dependencies:
+                raise ValueError(f"'{node}' depends on unknown step '{dep}'")
+
+    order, state = [], {}
+
+    def visit(node, path):
+        if state.get(node) == "done":
+            return
+        if state.get(node) == "visiting":
+            raise ValueError(f"Dependency cycle: {' -> '.join(path + [node])}")
+        state[node] = "visiting"
+        for dep in dependencies[node]:
+            visit(dep, path + [node])
+        state[node] = "done"
+        order.append(node)
+
+    for node in dependencies:
+        visit(node, [])
+    return order
+
+
+def run_dag(tasks: Dict[str, Callable[[Dict[str, Any]], Any]],
+            dependencies: Dict[str, List[str]],
+            max_workers: int = 4) -> Dict[str, Dict]:
+    """
+    Run tasks as a dependency graph with as much parallelism as the graph allows.
+
+    Each task is called with a dict of its dependencies' results as soon as
+    they have all succeeded. A failed task does not stop the run: only the
+    tasks that depend on it (directly or not) are skipped.
+
+    Args:
+        tasks: Node name -> callable taking {dependency name: result}
+        dependencies: Node name -> names of the nodes it needs
+        max_workers: Maximum number of tasks running at once
+
+    Returns:
+        Node name -> {"status": "ok" | "failed" | "skipped", "result" or "error",
+                      "seconds": wall-clock time of the task}
+    """
+    order = topological_order({name: list(dependencies.get(name, [])) for name in tasks})
+    outcomes = {}
+    pending = list(order)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dag") as pool:
+        while pending or running:
+            for name in list(pending):
+                deps = dependencies.get(name, [])
+                if any(outcomes.get(dep, {}).get("status") in ("failed", "skipped") for dep in deps):
+                    failed = [dep for dep in deps if outcomes[dep]["status"] != "ok"]
+                    outcomes[name] = {"status": "skipped", "error": f"dependency failed: {', '.join(failed)}",
+                                      "seconds": 0.0}
+                    pending.remove(name)
+                elif all(outcomes.get(dep, {}).get("status") == "ok" for dep in deps):
+                    inputs = {dep: outcomes[dep]["result"] for dep in deps}
+                    running[pool.submit(_timed, tasks[name], inputs)] = name
+                    pending.remove(name)
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                outcomes[running.pop(future)] = future.result()
+
+    return {name: outcomes[name] for name in order}
+
+
+def _timed(task: Callable, inputs: Dict[str, Any]) -> Dict:
+    start = time.perf_counter()
+    try:
+        result = task(inputs)
+        return {"status": "ok", "result": result, "seconds": time.perf_counter() - start}
+    except Exception as e:
+        return {"status": "failed", "error": str(e), "seconds": time.perf_counter() - start}
@@ -3,13 +3,41 @@ import traceback
 from typing import Any
 from core.action import Action
 from core.action_context import ActionContext
+from core.action_plan import normalize_plan, resolve_references
+from core.dag import run_dag
+from core.injection import inject
+from core.json_schema import SchemaValidationError
+from core.tool_cache import ToolResultCache, get_tool_cache
+from core.tool_executor import ToolExecutor, ToolTimeoutError, get_tool_executor
+
+_last_timestamp = (0, "")
+
+
+def _timestamp() -> str:
+    """Current time in ISO format, formatted at most once per second."""
+    global _last_timestamp
+    now = int(time.time())
+    if now != _last_timestamp[0]:
+        _last_timestamp = (now, time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(now)))
+    return _last_timestamp[1]
+
 
 class Environment:
+    def __init__(self, tool_cache: ToolResultCache = None, executor: ToolExecutor = None,
+                 max_plan_parallelism: int = 4):
+        self.tool_cache = tool_cache
+        self.executor = executor
+        self.max_plan_parallelism = max_plan_parallelism
+
     def execute_action(self, action: Action, args: dict) -> dict:
         """Execute an action and return the result."""
         try:
-            result = action.execute(**args)
+            result = self.call_action(action, args, args)
             return self.format_result(result)
+        except ToolTimeoutError as e:
+            return self.format_timeout(e)
+        except SchemaValidationError as e:
+            return self.format_invalid_arguments(e)
         except Exception as e:
             return {
                 "tool_executed": False,
@@ -17,12 +45,103 @@ class Environment:
                 "traceback": traceback.format_exc()
             }
 
+    def call_action(self, action: Action, args: dict, call_args: dict) -> Any:
+        """
+        Run an action, consulting the result cache first if the action is cacheable.
+
+        Args:
+            args: The arguments chosen by the LLM, which form the cache key
+            call_args: The arguments actually passed, including injected dependencies
+
+        Raises:
+            SchemaValidationError: If args do not match the action's schema; the tool is not run
+        """
+        action.validate_args(args)
+        executor = self.executor or get_tool_executor()
+        if not getattr(action, "cacheable", False):
+            return executor.run(action, call_args)
+
+        cache = self.tool_cache or get_tool_cache()
+        try:
+            key = cache.make_key(action.name, args, action.cache_key)
+        except Exception:
+            # e.g. the key function stats a file that does not exist; let the tool report it
+            return executor.run(action, call_args)
+
+        hit, result = cache.get(action.name, key, action.ttl)
+        if not hit:
+            result = executor.run(action, call_args)
+            cache.put(action.name, key, result)
+        return result
+
+    def execute_plan(self, steps: list, action_registry, action_context: ActionContext = None) -> dict:
+        """
+        Execute a multi-step plan (see core.action_plan) as a dependency graph.
+
+        Independent steps run in parallel; each step starts as soon as the steps it
+        depends on have finished and receives their outputs through its argument
+        references. A failing step only skips the steps downstream of it.
+
+        Args:
+            steps: The plan's steps as produced by the LLM
+            action_registry: Registry the steps' tools are looked up in
+            action_context: If given, dependencies are injected as in PythonEnvironment
+
+        Returns:
+            One result for the whole plan, with each step's status and result or error
+        """
+        try:
+            plan = normalize_plan(steps, action_registry)
+        except ValueError as e:
+            return {"tool_executed": False, "error": f"Invalid plan: {e}"}
+
+        def task(step):
+            def run(outputs):
+                action = action_registry.get_action(step["tool"])
+                args = resolve_references(step["args"], outputs)
+                call_args = inject(action.injection_plan, action_context, args) if action_context else args
+                return self.call_action(action, args, call_args)
+            return run
+
+        outcomes = run_dag(
+            {step["id"]: task(step) for step in plan},
+            {step["id"]: step["depends_on"] for step in plan},
+            max_workers=self.max_plan_parallelism
+        )
+        for step in plan:
+            outcomes[step["id"]] = {"tool": step["tool"], **outcomes[step["id"]]}
+            outcomes[step["id"]]["seconds"] = round(outcomes[step["id"]]["seconds"], 3)
+
+        return {
+            "tool_executed": all(o["status"] == "ok" for o in outcomes.values()),
+            "plan": outcomes,
+            "timestamp": _timestamp()
+        }
+
+    def format_timeout(self, error: ToolTimeoutError) -> dict:
+        """Structured result for a tool that did not finish in time."""
+        return {
+            "tool_executed": False,
+            "error": str(error),
+            "error_type": "timeout",
+            "timeout_seconds": error.timeout
+        }
+
+    def format_invalid_arguments(self, error: SchemaValidationError) -> dict:
+        """Structured result for a call rejected before execution, listing each problem."""
+        return {
+            "tool_executed": False,
+            "error": str(error),
+            "error_type": "invalid_arguments",
+            "errors": error.errors
+        }
+
     def format_result(self, result: Any) -> dict:
         """Format the result with metadata."""
         return {
             "tool_executed": True,
             "result": result,
-            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z")
+            "timestamp": _timestamp()
         }
     
 class PythonEnvironment(Environment):
@@ -30,24 +149,22 @@ class PythonEnvironment(Environment):
                       action: Action, args: dict) -> dict:
         """Execute an action with automatic dependency injection."""
         try:
-            # Create a copy of args to avoid modifying the original
-            args_copy = args.copy()
-
-            # If the function wants action_context, provide it
-            if has_named_parameter(action.function, "action_context"): # type: ignore
-                args_copy["action_context"] = action_context
-
-            # Inject properties from action_context that match _prefixed parameters
-            for key, value in action_context.properties.items():
-                param_name = "_" + key
-                if has_named_parameter(action.function, param_name): # type: ignore
-                    args_copy[param_name] = value
+            # Copy args and inject action_context and the _prefixed properties the
+            # function declares, following the plan computed at registration
+            args_copy = inject(action.injection_plan, action_context, args)
 
             # Execute the function with injected dependencies
-            result = action.execute(**args_copy)
+            result = self.call_action(action, args, args_copy)
             return self.format_result(result)
+        except ToolTimeoutError as e:
+            return self.format_timeout(e)
+        except SchemaValidationError as e:
+            return self.format_invalid_arguments(e)
         except Exception as e:
             return {
                 "tool_executed": False,
                 "error": str(e)
-            }
\ No newline at end of file
+            }
+
+    def execute_plan(self, steps: list, action_registry, action_context: ActionContext = None) -> dict:
+        return super().execute_plan(steps, action_registry, action_context or ActionContext())
\ No newline at end of file
@@ -1,9 +1,19 @@
-from core import prompt_expert
+from concurrent.futures import ThreadPoolExecutor
+from core.llm_client import get_default_client
+from core.map_reduce import consult_with_map_reduce
+from core.persona_cache import get_persona_cache
+from core.prompt_expert import prompt_expert
 from core.action_context import ActionContext
 from core.prompt import Prompt
 from core.tool_decorator import register_tool
 
 
+def expert_caller(action_context: ActionContext):
+    """prompt_expert bound to an action context, in the form consult_with_map_reduce calls it."""
+    return lambda description, prompt: prompt_expert(
+        action_context=action_context, description_of_expert=description, prompt=prompt)
+
+
 @register_tool(tags=["documentation"])
 def generate_technical_documentation(action_context: ActionContext, code_or_feature: str) -> str:
     """
@@ -13,8 +23,7 @@ def generate_technical_documentation(action_context: ActionContext, code_or_feat
     Args:
         code_or_feature: The code or feature to document
     """
-    return prompt_expert(
-        action_context=action_context,
+    return consult_with_map_reduce(
         description_of_expert="""
         You are a senior technical writer with 15 years of experience in software documentation.
         You have particular expertise in:
@@ -28,7 +37,7 @@ def generate_technical_documentation(action_context: ActionContext, code_or_feat
         and clarity. You understand that good technical documentation serves as both
         a reference and a learning tool.
         """,
-        prompt=f"""
+        build_prompt=lambda code_or_feature: f"""
         Please create comprehensive technical documentation for the following code or feature:
 
         {code_or_feature}
@@ -43,7 +52,10 @@ def generate_technical_documentation(action_context: ActionContext, code_or_feat
         
         Focus on providing information that developers need to effectively understand
         and work with this code.
-        """
+        """,
+        text=code_or_feature,
+        merge_instruction="Combine these partial documents into one coherent technical document with a single overview, merging overlapping sections and removing repetition.",
+        consult=expert_caller(action_context)
     )
 
 @register_tool(tags=["testing"])
@@ -55,8 +67,7 @@ def design_test_suite(action_context: ActionContext, feature_description: str) -
     Args:
         feature_description: Description of the feature to test
     """
-    return prompt_expert(
-        action_context=action_context,
+    return consult_with_map_reduce(
         description_of_expert="""
         You are a senior QA engineer with 12 years of experience in test design and automation.
         Your expertise includes:
@@ -70,7 +81,7 @@ def design_test_suite(action_context: ActionContext, feature_description: str) -
         that others might miss. Your test suites are known for their thoroughness and
         their ability to catch issues early in the development cycle.
         """,
-        prompt=f"""
+        build_prompt=lambda feature_description: f"""
         Please design a comprehensive test suite for the following feature:
 
         {feature_description}
@@ -88,7 +99,10 @@ def design_test_suite(action_context: ActionContext, feature_description: str) -
         - Expected outcomes
         - Important edge cases to consider
         - Potential testing challenges
-        """
+        """,
+        text=feature_description,
+        merge_instruction="Combine these partial test designs into one test suite organized by test category, merging duplicate scenarios.",
+        consult=expert_caller(action_context)
     )
 
 @register_tool(tags=["code_quality"])
@@ -100,8 +114,7 @@ def perform_code_review(action_context: ActionContext, code: str) -> str:
     Args:
         code: The code to review
     """
-    return prompt_expert(
-        action_context=action_context,
+    return consult_with_map_reduce(
         description_of_expert="""
         You are a senior software architect with 20 years of experience in code review
         and software design. Your expertise includes:
@@ -114,7 +127,7 @@ def perform_code_review(action_context: ActionContext, code: str) -> str:
         You have a talent for identifying subtle design issues and suggesting practical
         improvements that enhance code quality without over-engineering.
         """,
-        prompt=f"""
+        build_prompt=lambda code: f"""
         Please review the following code and provide detailed improvement suggestions:
 
         {code}
@@ -132,7 +145,10 @@ def perform_code_review(action_context: ActionContext, code: str) -> str:
         - Provide the rationale for change
         - Suggest specific improvements
         - Note any trade-offs to consider
-        """
+        """,
+        text=code,
+        merge_instruction="Combine these partial reviews into one code review: merge duplicate findings, order suggestions by importance and keep each one specific.",
+        consult=expert_caller(action_context)
     )
 
 @register_tool(tags=["communication"])
@@ -195,6 +211,10 @@ def create_and_consult_expert(action_context: ActionContext,
     Returns:
         The expert's insights and recommendations
     """
+    cache = get_persona_cache()
+    persona_key = cache.persona_key(expertise_domain, problem_description)
+    prompt_key = cache.prompt_key(expertise_domain, problem_description)
+
     # Step 1: Dynamically generate a persona description
     persona_description_prompt = f"""
     Create a detailed description of an expert in {expertise_domain} who would be 
@@ -209,11 +229,6 @@ def create_and_consult_expert(action_context: ActionContext,
     - The unique perspective they bring to this type of challenge
     """
     
-    generate_response = action_context.get("llm")
-    persona_description = generate_response(Prompt(messages=[
-        {"role": "user", "content": persona_description_prompt}
-    ]))
-    
     # Step 2: Generate a specialized consultation prompt
     consultation_prompt_generator = f"""
     Create a detailed consultation prompt for an expert in {expertise_domain} 
@@ -224,14 +239,25 @@ def create_and_consult_expert(action_context: ActionContext,
     The prompt should guide the expert to provide comprehensive insights and
     actionable recommendations specific to this problem.
     """
-    
-    consultation_prompt = generate_response(Prompt(messages=[
-        {"role": "user", "content": consultation_prompt_generator}
-    ]))
+
+    # Steps 1 and 2 are independent: reuse what is cached and generate the rest concurrently
+    generate_response = action_context.get("llm") or get_default_client().generate_response
+
+    def cached_or_generated(key, request):
+        value = cache.get(key)
+        if value is None:
+            value = generate_response(Prompt(messages=[{"role": "user", "content": request}]))
+            cache.put(key, value)
+        return value
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        persona = pool.submit(cached_or_generated, persona_key, persona_description_prompt)
+        consultation = pool.submit(cached_or_generated, prompt_key, consultation_prompt_generator)
+        persona_description, consultation_prompt = persona.result(), consultation.result()
     
     # Step 3: Consult the dynamically created persona
     return prompt_expert(
         action_context=action_context,
         description_of_expert=persona_description,
         prompt=consultation_prompt
-    )
\ No newline at end of file
+    )
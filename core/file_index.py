@@ -0,0 +1,128 @@
+import fnmatch
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Tuple
+
+# Directories that are never worth indexing for an agent
+DEFAULT_IGNORE = (".git", ".hg", ".svn", "__pycache__", "node_modules", ".venv", "venv",
+                  ".tox", ".nox", ".mypy_cache", ".pytest_cache", ".ruff_cache", ".artifacts",
+                  "*.egg-info")
+
+
+class FileIndex:
+    """
+    Cached listing of every file under a root directory.
+
+    The first refresh walks the tree with os.scandir. Later refreshes stat each
+    directory and rescan only those whose mtime changed, i.e. where entries were
+    added, removed or renamed; everything else is reused from the index, so a
+    refresh of an unchanged tree costs one stat per directory.
+    """
+
+    def __init__(self, root: str = ".", ignore: Iterable[str] = DEFAULT_IGNORE):
+        self.root = os.path.abspath(root)
+        self.ignore = tuple(ignore)
+        # Relative directory -> (mtime_ns, subdirectory names, file names)
+        self._dirs: Dict[str, Tuple[int, List[str], List[str]]] = {}
+        self._lock = threading.Lock()
+        self.scanned = 0
+
+    def refresh(self):
+        """Bring the index up to date with the file system."""
+        with self._lock:
+            self.scanned = 0
+            seen = {}
+            pending = [""]
+            while pending:
+                rel = pending.pop()
+                path = os.path.join(self.root, rel) if rel else self.root
+                try:
+                    mtime = os.stat(path).st_mtime_ns
+                except OSError:
+                    continue
+                entry = self._dirs.get(rel)
+                if entry is None or entry[0] != mtime:
+                    entry = self._scan(path, mtime)
+                    self.scanned += 1
+                seen[rel] = entry
+                pending.extend(f"{rel}/{name}" if rel else name for name in entry[1])
+            # Directories not reached any more were removed (or are now ignored)
+            self._dirs = seen
+
+    def files(self, pattern: str = None, ignore: Iterable[str] = ()) -> List[str]:
+        """
+        Relative paths ("/"-separated, sorted) of indexed files, after a refresh.
+
+        Args:
+            pattern: Glob matched against the file name, or against the relative
+                path if it contains "/" (e.g. "src/*.py"); None matches everything
+            ignore: Further glob patterns; a file or directory whose name or
+                relative path matches one is left out
+        """
+        self.refresh()
+        ignore = tuple(ignore)
+        by_path = "/" in pattern if pattern else False
+        found = []
+        with self._lock:
+            pending = [""]
+            while pending:
+                rel = pending.pop()
+                entry = self._dirs.get(rel)
+                if entry is None:
+                    continue
+                for name in entry[1]:
+                    sub = f"{rel}/{name}" if rel else name
+                    if not _ignored(name, sub, ignore):
+                        pending.append(sub)
+                for name in entry[2]:
+                    path = f"{rel}/{name}" if rel else name
+                    if ignore and _ignored(name, path, ignore):
+                        continue
+                    if pattern is None or fnmatch.fnmatch(path if by_path else name, pattern):
+                        found.append(path)
+        found.sort()
+        return found
+
+    def _scan(self, path: str, mtime: int) -> Tuple[int, List[str], List[str]]:
+        directories, files = [], []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if is_dir:
+                        if not _ignored(entry.name, entry.name, self.ignore):
+                            directories.append(entry.name)
+                    elif not _ignored(entry.name, entry.name, self.ignore):
+                        files.append(entry.name)
+        except OSError as e:
+            print(f"Cannot list {path}: {e}")
+        return mtime, directories, files
+
+
+def _ignored(name: str, path: str, patterns: Tuple[str, ...]) -> bool:
+    return any(fnmatch.fnmatch(name, p) or fnmatch.fnmatch(path, p) for p in patterns)
+
+
+# Indexes kept for the most recently used roots; older ones are dropped
+MAX_INDEXES = 8
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_file_index(root: str = ".") -> FileIndex:
+    """The shared index for a root directory, created on first use."""
+    root = os.path.abspath(root)
+    with _indexes_lock:
+        index = _indexes.get(root)
+        if index is None:
+            index = _indexes[root] = FileIndex(root)
+            while len(_indexes) > MAX_INDEXES:
+                _indexes.popitem(last=False)
+        else:
+            _indexes.move_to_end(root)
+        return index
@@ -1,5 +1,12 @@
+import hashlib
+import json
 import os
-from typing import List
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Tuple
+from core.file_index import get_file_index
+from core.ranged_reader import DEFAULT_MAX_BYTES, read_range
 from core.tool_decorator import register_tool
 from dotenv import load_dotenv
 
@@ -8,36 +15,89 @@ load_dotenv()
 
 OUTPUT_DIR = os.getenv("OUTPUT_DIR", ".")  # Default to current directory if not set
 
-@register_tool(tags=["file_operations", "read"])
-def read_project_file(name: str) -> str:
-    """Reads and returns the content of a specified project file.
+# Hard cap on a single read_project_file call, whatever max_bytes asks for
+MAX_READ_BYTES = 1024 * 1024
 
-    Opens the file in read mode and returns its entire contents as a string.
-    Raises FileNotFoundError if the file doesn't exist.
+def _inside(root: str, path: str) -> bool:
+    """Whether path lies under root, both with symlinks resolved."""
+    root = os.path.realpath(root)
+    return os.path.commonpath([root, os.path.realpath(path)]) == root
+
+
+def _project_path(path: str) -> str:
+    """
+    Resolve path (symlinks included) against the current directory; raises
+    ValueError unless it lies inside the project, i.e. the current directory or OUTPUT_DIR.
+    """
+    if not (_inside(".", path) or _inside(OUTPUT_DIR, path)):
+        raise ValueError(f"Path '{path}' is outside the project directory")
+    return os.path.realpath(path)
+
+
+def _file_version(name: str, **kwargs):
+    """Cache key part for file reads: changes whenever the file is modified."""
+    stat = os.stat(name)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+@register_tool(tags=["file_operations", "read"], cacheable=True, key=_file_version)
+def read_project_file(name: str,
+                      start_line: int = None,
+                      end_line: int = None,
+                      start: int = None,
+                      end: int = None,
+                      max_bytes: int = DEFAULT_MAX_BYTES) -> str:
+    """Reads a project file, or part of it.
+
+    Request line ranges (1-based, inclusive) or byte ranges to read part of a
+    large file; byte offsets count from the first requested line, if any. At
+    most max_bytes are returned (64 KB by default, never more than 1 MB); a
+    note at the end says when the file was cut short.
+    Raises FileNotFoundError if the file doesn't exist, ValueError if it is
+    outside the project directory.
 
     Args:
         name: The name of the file to read
+        start_line: First line to read
+        end_line: Last line to read
+        start: First byte offset to read
+        end: Byte offset to stop reading at
+        max_bytes: Maximum number of bytes to return
 
     Returns:
-        The contents of the file as a string
+        The requested contents of the file as a string
     """
-    with open(name, "r") as f:
-        return f.read()
-
+    max_bytes = min(max_bytes or DEFAULT_MAX_BYTES, MAX_READ_BYTES)
+    return read_range(_project_path(name), start=start, end=end, start_line=start_line, end_line=end_line,
+                      max_bytes=max_bytes)
 
 
 @register_tool(tags=["file_operations", "list"])
-def list_project_files() -> List[str]:
-    """Lists all Python files in the current project directory.
+def list_project_files(pattern: str = "*.py",
+                       path: str = ".",
+                       ignore: List[str] = None,
+                       max_results: int = 1000) -> List[str]:
+    """Lists project files matching a glob pattern, searching subdirectories too.
+
+    Version control, virtualenv, cache and node_modules directories are skipped.
+    Results come from an index that is refreshed incrementally, so repeated
+    listings of a large project are cheap.
 
-    Scans the current directory and returns a sorted list of all files
-    that end with '.py'.
+    Args:
+        pattern: Glob for file names (e.g. "*.py", "*.md"), or for relative paths if it
+            contains "/" (e.g. "core/*.py"); "*" lists every file
+        path: Directory to search, relative to the current directory; it must be inside the project
+        ignore: Additional glob patterns for file or directory names/paths to skip
+        max_results: Maximum number of paths to return
 
     Returns:
-        A sorted list of Python filenames
+        A sorted list of relative file paths; if more matched, the last entry says how many were left out
     """
-    return sorted([file for file in os.listdir(".")
-                    if file.endswith(".py")])
+    found = get_file_index(_project_path(path)).files(pattern, ignore or ())
+    if len(found) > max_results:
+        omitted = len(found) - max_results
+        found = found[:max_results] + [f"...[{omitted} more files; use a narrower pattern or path]"]
+    return found
 
 
 @register_tool(tags=["file_operations", "write"])
@@ -45,7 +105,8 @@ def write_to_file(name: str, content: str) -> str:
     """Writes content to a specified file in the OUTPUT_DIR."""
 
     filepath = os.path.normpath(os.path.join(OUTPUT_DIR, name))
-    print(f"Attempting to create: {filepath}")  # Debug output
+    if not _inside(OUTPUT_DIR, filepath):
+        raise ValueError(f"'{name}' is outside the output directory")
 
     parent_dir = os.path.dirname(filepath) or '.'
     # Create parent directory if it doesn't exist
@@ -58,8 +119,250 @@ def write_to_file(name: str, content: str) -> str:
 
     with open(filepath, "w") as f:
         f.write(content)
-    print(f"File '{filepath}' written successfully.")  # Debug print
     return filepath
-    
 
-#
\ No newline at end of file
+
+def _atomic_write(filepath: str, data: bytes):
+    """Write to a temporary file next to filepath, then rename it over filepath."""
+    tmp = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+    # Created with the usual permissions (0o666 minus the umask), like open(..., "w")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, filepath)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+# Per output directory: content hashes of the files each source wrote there last
+MANIFEST_FILE = ".manifest.json"
+_manifest_lock = threading.Lock()
+
+
+def _load_manifest(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if isinstance(manifest, dict) and isinstance(manifest.get("sources"), dict):
+            return manifest
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable manifest {path}: {e}")
+    return {"sources": {}}
+
+
+class BulkWriter:
+    """
+    Writes many files at once, e.g. a generated project.
+
+    Files are written on a thread pool, each one atomically (a temporary file
+    renamed into place), so readers never see a half-written file. Each parent
+    directory is created and checked for write permission once per writer
+    rather than once per file. close() waits for the writes and returns a
+    manifest of what was written.
+
+    The content hash of every file is recorded in base_dir/.manifest.json,
+    grouped by source (e.g. the pipeline stage that generated the files). A
+    file whose content is unchanged is not rewritten, so file watchers and
+    incremental builds only see real changes. Files the source wrote before
+    but not this time are reported as removed, and deleted if prune is set
+    (without it they stay on record, so a later pruning run still finds them);
+    files written by other sources are never touched.
+    """
+
+    def __init__(self, base_dir: str = None, max_workers: int = 8,
+                 source: str = "default", prune: bool = False):
+        self.base_dir = os.path.abspath(OUTPUT_DIR if base_dir is None else base_dir)
+        self.source = source
+        self.prune = prune
+        self.manifest_path = os.path.join(self.base_dir, MANIFEST_FILE)
+        with _manifest_lock:
+            self._previous = _load_manifest(self.manifest_path)["sources"].get(source, {})
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+        self._pending = []
+        self._directories = {}
+        self._directories_lock = threading.Lock()
+        self._start = time.perf_counter()
+        self.manifest = None
+
+    def submit(self, name: str, content: str) -> str:
+        """Queue a write of content to name (relative to base_dir); returns the full path."""
+        filepath = os.path.normpath(os.path.join(self.base_dir, name))
+        self._pending.append((filepath, self._pool.submit(self._write, filepath, content)))
+        return filepath
+
+    def close(self, complete: bool = True) -> dict:
+        """
+        Wait for all queued writes and update the hash manifest.
+
+        Args:
+            complete: False if the source may not have produced all of its files
+                (e.g. its generation failed part way); files it did not write are
+                then neither reported as removed nor pruned. A writer that was given
+                no files at all is treated the same way, so an empty or failed
+                generation never wipes out a project
+
+        Returns:
+            {"base_dir", "files": {path: {"size", "sha256", "status"}}, "failed": {path: error},
+             "removed": [path, ...], "counts": {"added", "changed", "unchanged", "removed"},
+             "bytes", "seconds"}; files are in the order they were submitted, and
+            status is "added", "changed" or "unchanged"
+        """
+        if self.manifest is not None:
+            return self.manifest
+        complete = complete and bool(self._pending)
+        files, failed, entries = {}, {}, {}
+        for filepath, future in self._pending:
+            try:
+                files[filepath], entries[self._key(filepath)] = future.result()
+            except Exception as e:
+                failed[filepath] = str(e)
+        self._pool.shutdown()
+
+        kept = {key: entry for key, entry in self._previous.items()
+                if key not in entries and (not complete or self._path(key) in failed)}
+        # A key outside base_dir (a hand-edited manifest) is never ours to report or prune
+        orphans = [key for key in self._previous
+                   if key not in entries and key not in kept and os.path.exists(self._path(key))
+                   and _inside(self.base_dir, self._path(key))]
+        removed = [self._path(key) for key in orphans]
+        if removed and self.prune:
+            with _manifest_lock:
+                sources = _load_manifest(self.manifest_path)["sources"]
+            # A path another source still generates is theirs now; only forget it here
+            claimed = {key for source, entries in sources.items() if source != self.source
+                       for key, entry in entries.items() if not entry.get("orphaned")}
+            self._remove([self._path(key) for key in orphans if key not in claimed])
+        else:
+            # Stay in the manifest until regenerated or pruned by a later run
+            kept.update((key, {**self._previous[key], "orphaned": True}) for key in orphans)
+        self._save({**kept, **entries})
+
+        counts = {status: sum(1 for entry in files.values() if entry["status"] == status)
+                  for status in ("added", "changed", "unchanged")}
+        counts["removed"] = len(removed)
+        self.manifest = {
+            "base_dir": self.base_dir,
+            "files": files,
+            "failed": failed,
+            "removed": removed,
+            "counts": counts,
+            "bytes": sum(entry["size"] for entry in files.values() if entry["status"] != "unchanged"),
+            "seconds": time.perf_counter() - self._start,
+        }
+        if self._pending or removed:
+            print(f"Wrote {counts['added'] + counts['changed']} of {len(files)} files "
+                  f"({self.manifest['bytes']} bytes) under {self.base_dir} in {self.manifest['seconds']:.2f}s: "
+                  f"{counts['added']} added, {counts['changed']} changed, {counts['unchanged']} unchanged, "
+                  f"{counts['removed']} removed" + (" (pruned)" if removed and self.prune else "")
+                  + (f", {len(failed)} failed" if failed else ""))
+        for filepath, error in failed.items():
+            print(f"Error writing {filepath}: {error}")
+        return self.manifest
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.close(complete=exc_type is None)
+
+    def _key(self, filepath: str) -> str:
+        return os.path.relpath(filepath, self.base_dir).replace(os.sep, "/")
+
+    def _path(self, key: str) -> str:
+        return os.path.normpath(os.path.join(self.base_dir, key))
+
+    def _write(self, filepath: str, content: str):
+        if not _inside(self.base_dir, filepath):
+            raise ValueError(f"'{filepath}' is outside {self.base_dir}")
+        data = content.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        try:
+            stat = os.stat(filepath)
+        except FileNotFoundError:
+            stat = None
+
+        if stat is not None and stat.st_size == len(data):
+            previous = self._previous.get(self._key(filepath))
+            # Trust the manifest while the file is as we left it; otherwise compare contents
+            if previous and previous["sha256"] == digest and previous.get("mtime_ns") == stat.st_mtime_ns:
+                unchanged = True
+            else:
+                with open(filepath, "rb") as f:
+                    unchanged = hashlib.sha256(f.read()).hexdigest() == digest
+            if unchanged:
+                return ({"size": len(data), "sha256": digest, "status": "unchanged"},
+                        {"size": len(data), "sha256": digest, "mtime_ns": stat.st_mtime_ns})
+
+        self._ensure_directory(os.path.dirname(filepath) or ".")
+        _atomic_write(filepath, data)
+        return ({"size": len(data), "sha256": digest, "status": "added" if stat is None else "changed"},
+                {"size": len(data), "sha256": digest, "mtime_ns": os.stat(filepath).st_mtime_ns})
+
+    def _ensure_directory(self, directory: str):
+        # Only the first file in a directory pays for makedirs and the permission check
+        with self._directories_lock:
+            error = self._directories.get(directory)
+            if error is None:
+                try:
+                    os.makedirs(directory, mode=0o755, exist_ok=True)
+                    error = "" if os.access(directory, os.W_OK) else f"Permission denied: Cannot write to {directory}"
+                except OSError as e:
+                    error = str(e)
+                self._directories[directory] = error
+        if error:
+            raise PermissionError(error)
+
+    def _remove(self, paths: List[str]):
+        """Delete orphaned files, and any directories under base_dir that become empty."""
+        for filepath in paths:
+            if not _inside(self.base_dir, filepath):
+                print(f"Not removing {filepath}: it is outside {self.base_dir}")
+                continue
+            try:
+                os.remove(filepath)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Could not remove {filepath}: {e}")
+                continue
+            directory = os.path.dirname(filepath)
+            while directory.startswith(self.base_dir + os.sep):
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    break
+                directory = os.path.dirname(directory)
+
+    def _save(self, entries: dict):
+        if not entries and not self._previous:
+            return
+        with _manifest_lock:
+            # Re-read so concurrent writers for other sources are not overwritten
+            manifest = _load_manifest(self.manifest_path)
+            if entries:
+                manifest["sources"][self.source] = entries
+            else:
+                manifest["sources"].pop(self.source, None)
+            os.makedirs(self.base_dir, mode=0o755, exist_ok=True)
+            _atomic_write(self.manifest_path, json.dumps(manifest, indent=1, sort_keys=True).encode("utf-8"))
+
+
+def write_files(files: Iterable[Tuple[str, str]], base_dir: str = None, max_workers: int = 8,
+                source: str = "default", prune: bool = False) -> dict:
+    """
+    Write (name, content) pairs with a BulkWriter.
+
+    Returns:
+        The writer's manifest (see BulkWriter.close)
+    """
+    with BulkWriter(base_dir, max_workers, source, prune) as writer:
+        for name, content in files:
+            writer.submit(name, content)
+    return writer.manifest
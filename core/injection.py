@@ -0,0 +1,78 @@
+import inspect
+import time
+from typing import Callable, NamedTuple, Tuple
+
+
+class InjectionPlan(NamedTuple):
+    """
+    What PythonEnvironment injects into a tool call, worked out once per Action
+    instead of by signature introspection on every dispatch.
+
+    context: whether the function takes an action_context parameter
+    properties: (property key, parameter name) pairs for _prefixed parameters,
+        e.g. ("memory", "_memory") receives action_context.properties["memory"]
+    """
+    context: bool
+    properties: Tuple[Tuple[str, str], ...]
+
+
+def build_injection_plan(func: Callable) -> InjectionPlan:
+    parameters = inspect.signature(func).parameters
+    return InjectionPlan(
+        context="action_context" in parameters,
+        properties=tuple(
+            (name[1:], name) for name, param in parameters.items()
+            if name.startswith("_") and len(name) > 1
+            and param.kind in (param.POSITIONAL_OR_KEYWORD, param.KEYWORD_ONLY)
+        )
+    )
+
+
+def inject(plan: InjectionPlan, action_context, args: dict) -> dict:
+    """Return a copy of args with the dependencies the plan asks for filled in."""
+    call_args = args.copy()
+    if plan.context:
+        call_args["action_context"] = action_context
+    if plan.properties:
+        properties = action_context.properties
+        for key, param_name in plan.properties:
+            if key in properties:
+                call_args[param_name] = properties[key]
+    return call_args
+
+
+def _benchmark(properties: int = 50, calls: int = 100000):
+    """Per-dispatch cost of introspecting the signature vs. applying a precomputed plan."""
+    from core.action_context import ActionContext
+
+    def tool(action_context, query: str, _memory=None, _llm=None, _auth_token=None):
+        return query
+
+    context = ActionContext({f"prop_{i}": i for i in range(properties)})
+    context.properties.update(memory=[], llm=None, auth_token="t")
+    args = {"query": "q"}
+
+    def introspect():
+        call_args = args.copy()
+        if "action_context" in inspect.signature(tool).parameters:
+            call_args["action_context"] = context
+        for key, value in context.properties.items():
+            if "_" + key in inspect.signature(tool).parameters:
+                call_args["_" + key] = value
+        return call_args
+
+    plan = build_injection_plan(tool)
+    assert introspect() == inject(plan, context, args)
+
+    for label, fn in (("signature introspection", introspect),
+                      ("precomputed plan", lambda: inject(plan, context, args))):
+        n = calls // 100 if fn is introspect else calls
+        start = time.perf_counter()
+        for _ in range(n):
+            fn()
+        print(f"{label:<26} {(time.perf_counter() - start) / n * 1e6:9.2f} us/call "
+              f"({properties + 3} context properties)")
+
+
+if __name__ == "__main__":
+    _benchmark()
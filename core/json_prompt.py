@@ -1,47 +1,155 @@
+import hashlib
 import json
+import threading
+import time
+from collections import deque
 
 from core.action_context import ActionContext
+from core.json_schema import SchemaValidationError, compile_validator
+from core.llm_client import get_default_client
 from core.prompt import Prompt
+from core.response_parser import ResponseParseError, parse_json_object
 from core.tool_decorator import register_tool
 
+# Rendered instruction, response_format and compiled validator per schema hash,
+# and per schema object (by id, holding the object so its id cannot be reused)
+_schemas = {}
+_schemas_by_id = {}
+_schemas_lock = threading.Lock()
+MAX_CACHED_SCHEMAS = 128
+
+_stats_lock = threading.Lock()
+_stats = {"calls": 0, "first_try": 0, "after_retry": 0, "failed": 0}
+_latencies = deque(maxlen=1000)
+
+# Further attempts when the LLM call itself fails (network, rate limit...)
+TRANSPORT_RETRIES = 2
+
+FREEFORM_INSTRUCTION = "You MUST respond with a single JSON object and nothing else."
+
+
+def _compiled(schema: dict):
+    """
+    (instruction, response_format, validator) for a schema, built once per distinct schema.
+
+    A schema object passed again is found by identity, without serializing it;
+    a schema must therefore not be modified after it has been used.
+    """
+    if schema is None:
+        return FREEFORM_INSTRUCTION, {"type": "json_object"}, None
+
+    with _schemas_lock:
+        entry = _schemas_by_id.get(id(schema))
+    if entry is not None and entry[0] is schema:
+        return entry[1]
+
+    digest = hashlib.sha1(json.dumps(schema, sort_keys=True, default=str).encode()).hexdigest()
+    with _schemas_lock:
+        found = _schemas.get(digest)
+    if found is not None:
+        _remember(schema, found)
+        return found
+
+    compiled = (
+        "You MUST produce output that adheres to the following JSON schema:\n\n"
+        f"{json.dumps(schema, indent=4)}\n\nRespond with the JSON object only.",
+        {"type": "json_schema",
+         "json_schema": {"name": f"response_{digest[:8]}", "schema": schema}},
+        compile_validator(schema),
+    )
+    with _schemas_lock:
+        if len(_schemas) >= MAX_CACHED_SCHEMAS:
+            _schemas.pop(next(iter(_schemas)))
+        _schemas[digest] = compiled
+    _remember(schema, compiled)
+    return compiled
+
+
+def _remember(schema: dict, compiled):
+    with _schemas_lock:
+        if len(_schemas_by_id) >= MAX_CACHED_SCHEMAS:
+            _schemas_by_id.pop(next(iter(_schemas_by_id)))
+        _schemas_by_id[id(schema)] = (schema, compiled)
+
+
+def _record(outcome: str, seconds: float):
+    with _stats_lock:
+        _stats["calls"] += 1
+        _stats[outcome] += 1
+        _latencies.append(seconds)
+
+
+def get_json_prompt_stats() -> dict:
+    """Success rate and latency of prompt_llm_for_json calls so far in this process."""
+    with _stats_lock:
+        stats = dict(_stats)
+        latencies = sorted(_latencies)
+    succeeded = stats["first_try"] + stats["after_retry"]
+    stats["success_rate"] = succeeded / stats["calls"] if stats["calls"] else None
+    stats["latency_avg"] = sum(latencies) / len(latencies) if latencies else None
+    stats["latency_p95"] = latencies[int(0.95 * (len(latencies) - 1))] if latencies else None
+    return stats
+
 
 @register_tool()
-def prompt_llm_for_json(action_context: ActionContext, schema: dict, prompt: str):
+def prompt_llm_for_json(action_context: ActionContext, schema: dict = None, prompt: str = None):
     """
     Have the LLM generate JSON in response to a prompt. Always use this tool when you need structured data out of the LLM.
     This function takes a JSON schema that specifies the structure of the expected JSON response.
-    
+
     Args:
-        schema: JSON schema defining the expected structure
+        schema: JSON schema defining the expected structure; without one any JSON object is accepted
         prompt: The prompt to send to the LLM
-        
+
     Returns:
         A dictionary matching the provided schema with extracted information
     """
-    generate_response = action_context.get("llm")
-    
-    # Try up to 3 times to get valid JSON
-    for i in range(3):
+    if prompt is None:
+        raise ValueError("prompt_llm_for_json needs a prompt")
+    generate_response = action_context.get("llm") or get_default_client().generate_response
+    instruction, response_format, validate = _compiled(schema)
+
+    # The response_format lets the client use the provider's native JSON mode
+    messages = [
+        {"role": "system", "content": instruction},
+        {"role": "user", "content": prompt}
+    ]
+    start = time.perf_counter()
+
+    # Failed LLM calls are retried as before; an invalid answer gets one retry,
+    # told exactly what was wrong with it
+    call_retries, answer_retries = TRANSPORT_RETRIES, 1
+    while True:
         try:
-            # Send prompt with schema instruction and get response
-            response = generate_response(Prompt(messages=[
-                {"role": "system", 
-                 "content": f"You MUST produce output that adheres to the following JSON schema:\n\n{json.dumps(schema, indent=4)}. Output your JSON in a ```json markdown block."},
-                {"role": "user", "content": prompt}
-            ]))
-
-            # Check if the response has json inside of a markdown code block
-            if "```json" in response:
-                # Search from the front and then the back
-                start = response.find("```json")
-                end = response.rfind("```")
-                response = response[start+7:end].strip()
-
-            # Parse and validate the JSON response
-            return json.loads(response)
-            
+            response = generate_response(Prompt(messages=messages, metadata={"response_format": response_format}))
         except Exception as e:
-            if i == 2:  # On last try, raise the error
-                raise e
-            print(f"Error generating response: {e}")
-            print("Retrying...")
\ No newline at end of file
+            if call_retries == 0:
+                _record("failed", time.perf_counter() - start)
+                raise
+            call_retries -= 1
+            print(f"Error generating response ({e}), retrying...")
+            continue
+        try:
+            value = parse_json_object(response)
+            errors = validate(value) if validate else []
+            if errors:
+                raise SchemaValidationError(errors, "JSON")
+        except (ResponseParseError, SchemaValidationError) as e:
+            if answer_retries == 0:
+                _record("failed", time.perf_counter() - start)
+                raise
+            answer_retries -= 1
+            print(f"Error generating JSON ({e}), retrying...")
+            messages = messages + [
+                {"role": "assistant", "content": response},
+                {"role": "user", "content": f"That response was rejected: {e}\n"
+                                            "Reply with corrected JSON only."}
+            ]
+            continue
+
+        seconds = time.perf_counter() - start
+        first_try = call_retries == TRANSPORT_RETRIES and answer_retries == 1
+        _record("first_try" if first_try else "after_retry", seconds)
+        print(f"prompt_llm_for_json: valid JSON in {seconds:.2f}s "
+              f"({'first try' if first_try else 'after retrying'})")
+        return value
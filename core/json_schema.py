@@ -0,0 +1,303 @@
+import collections.abc
+import dataclasses
+import enum
+import types
+import typing
+from typing import Any, Callable, Dict, List, get_args, get_origin, get_type_hints
+
+_PRIMITIVES = {str: "string", int: "integer", float: "number", bool: "boolean", type(None): "null"}
+_JSON_TYPES = {
+    "string": lambda v: isinstance(v, str),
+    # 2.0 is not accepted: the tool would receive a float where it expects an int
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "array": lambda v: isinstance(v, list),
+    "object": lambda v: isinstance(v, dict),
+    "null": lambda v: v is None,
+}
+_JSON_NAMES = {str: "string", bool: "boolean", int: "integer", float: "number",
+               list: "array", tuple: "array", dict: "object", type(None): "null"}
+
+
+class SchemaValidationError(ValueError):
+    """Raised when a value does not match a JSON schema; errors lists every mismatch."""
+
+    def __init__(self, errors: List[str], subject: str = "value"):
+        super().__init__(f"Invalid {subject}: " + "; ".join(errors))
+        self.errors = errors
+
+
+def schema_for_type(tp) -> dict:
+    """
+    Translate a Python type annotation into a JSON schema.
+
+    Handles primitives, List/Sequence/Set/Tuple, Dict/Mapping, Optional and
+    Union, Literal, Enum, dataclasses and TypedDicts, nested arbitrarily. Any
+    other class becomes a plain object.
+    """
+    if tp is Any:
+        return {}
+    if tp in _PRIMITIVES:
+        return {"type": _PRIMITIVES[tp]}
+
+    origin, args = get_origin(tp), get_args(tp)
+
+    if origin is typing.Union or origin is getattr(types, "UnionType", None):
+        options = [arg for arg in args if arg is not type(None)]
+        schema = schema_for_type(options[0]) if len(options) == 1 \
+            else {"anyOf": [schema_for_type(arg) for arg in options]}
+        return nullable(schema) if len(options) < len(args) else schema
+
+    if origin is typing.Literal:
+        values = list(args)
+        kinds = {_PRIMITIVES.get(type(v)) for v in values}
+        return {"type": kinds.pop(), "enum": values} if len(kinds) == 1 else {"enum": values}
+
+    if origin in (list, set, frozenset, collections.abc.Sequence, collections.abc.Set,
+                  collections.abc.Iterable, collections.abc.MutableSequence):
+        return {"type": "array", "items": schema_for_type(args[0])} if args else {"type": "array"}
+
+    if origin is tuple:
+        if not args or (len(args) == 2 and args[1] is Ellipsis):
+            return {"type": "array", "items": schema_for_type(args[0])} if args else {"type": "array"}
+        items = [schema_for_type(arg) for arg in args]
+        return {"type": "array", "items": items[0] if len(set(map(repr, items))) == 1 else {"anyOf": items},
+                "minItems": len(args), "maxItems": len(args)}
+
+    if origin in (dict, collections.abc.Mapping, collections.abc.MutableMapping):
+        if len(args) == 2 and args[1] is not Any:
+            return {"type": "object", "additionalProperties": schema_for_type(args[1])}
+        return {"type": "object"}
+
+    if tp in (list, tuple, set, frozenset):
+        return {"type": "array"}
+    if tp is dict:
+        return {"type": "object"}
+
+    if isinstance(tp, type) and issubclass(tp, enum.Enum):
+        values = [member.value for member in tp]
+        kinds = {_PRIMITIVES.get(type(v)) for v in values}
+        return {"type": kinds.pop(), "enum": values} if len(kinds) == 1 else {"enum": values}
+
+    if dataclasses.is_dataclass(tp):
+        hints = get_type_hints(tp)
+        fields = [f for f in dataclasses.fields(tp) if f.init]
+        return _object_schema(
+            {f.name: hints.get(f.name, Any) for f in fields},
+            [f.name for f in fields
+             if f.default is dataclasses.MISSING and f.default_factory is dataclasses.MISSING]
+        )
+
+    if isinstance(tp, type) and issubclass(tp, dict) and hasattr(tp, "__required_keys__"):
+        hints = get_type_hints(tp)
+        return _object_schema(hints, [k for k in hints if k in tp.__required_keys__])
+
+    return {"type": "object"}
+
+
+def nullable(schema: dict) -> dict:
+    """The schema extended to also accept null, as for Optional[...] or a None default."""
+    if not schema:
+        return schema  # already accepts anything
+    kind = schema.get("type")
+    if isinstance(kind, str) or isinstance(kind, list):
+        kinds = [kind] if isinstance(kind, str) else list(kind)
+        if "null" in kinds:
+            return schema
+        schema = {**schema, "type": kinds + ["null"]}
+        if "enum" in schema and None not in schema["enum"]:
+            schema["enum"] = list(schema["enum"]) + [None]
+        return schema
+    if set(schema) == {"anyOf"}:
+        return {"anyOf": schema["anyOf"] + [{"type": "null"}]}
+    return {"anyOf": [schema, {"type": "null"}]}
+
+
+def _object_schema(properties: Dict[str, Any], required: List[str]) -> dict:
+    schema = {"type": "object",
+              "properties": {name: schema_for_type(tp) for name, tp in properties.items()}}
+    if required:
+        schema["required"] = required
+    return schema
+
+
+def compile_validator(schema: dict, allow_extra: bool = True) -> Callable[[Any], List[str]]:
+    """
+    Turn a JSON schema into a function that checks a value against it.
+
+    The schema is walked once, here; the returned function only runs the
+    checks it needs. Supported keywords: type, properties, required,
+    additionalProperties, items, minItems, maxItems, enum, const, anyOf,
+    oneOf, nullable, minimum, maximum, minLength and maxLength.
+
+    Args:
+        schema: The JSON schema
+        allow_extra: If False, object properties the top-level schema does not
+            declare are rejected even without "additionalProperties": false
+
+    Returns:
+        A function taking a value and returning a list of error messages, empty if valid
+    """
+    check = _compile(schema, top_level_extra=allow_extra)
+
+    def validate(value) -> List[str]:
+        errors = []
+        check(value, "", errors)
+        return errors
+
+    return validate
+
+
+def _compile(schema: dict, top_level_extra: bool = True) -> Callable:
+    if not isinstance(schema, dict) or not schema:
+        return lambda value, path, errors: None
+
+    checks = []
+    nullable = schema.get("nullable", False)
+
+    expected = schema.get("type")
+    if expected is not None:
+        kinds = [expected] if isinstance(expected, str) else list(expected)
+        tests = [_JSON_TYPES[k] for k in kinds if k in _JSON_TYPES]
+        label = " or ".join(kinds)
+
+        if len(tests) == 1:
+            test = tests[0]
+        else:
+            def test(value):
+                return any(t(value) for t in tests)
+
+        def check_type(value, path, errors):
+            if not test(value):
+                errors.append(f"{_where(path)}expected {label}, got {_describe(value)}")
+                return False
+            return True
+        checks.append(check_type)
+
+    if "enum" in schema:
+        allowed = list(schema["enum"])
+
+        def check_enum(value, path, errors):
+            if value not in allowed:
+                errors.append(f"{_where(path)}must be one of {allowed}, got {value!r}")
+                return False
+            return True
+        checks.append(check_enum)
+
+    if "const" in schema:
+        const = schema["const"]
+
+        def check_const(value, path, errors):
+            if value != const:
+                errors.append(f"{_where(path)}must be {const!r}, got {value!r}")
+                return False
+            return True
+        checks.append(check_const)
+
+    for keyword in ("anyOf", "oneOf"):
+        if keyword in schema:
+            options = [_compile(option) for option in schema[keyword]]
+
+            def check_any(value, path, errors, options=options):
+                for option in options:
+                    attempt = []
+                    option(value, path, attempt)
+                    if not attempt:
+                        return True
+                errors.append(f"{_where(path)}does not match any allowed form, got {_describe(value)}")
+                return False
+            checks.append(check_any)
+
+    checks.extend(_compile_bounds(schema))
+
+    properties = {name: _compile(sub) for name, sub in schema.get("properties", {}).items()}
+    required = list(schema.get("required", []))
+    extra = schema.get("additionalProperties", True if top_level_extra else False)
+    extra_check = _compile(extra) if isinstance(extra, dict) else None
+    if properties or required or extra is not True:
+        def check_object(value, path, errors):
+            if not isinstance(value, dict):
+                return True
+            for name in required:
+                if name not in value:
+                    errors.append(f"missing required {_field(path, name)}")
+            for name, item in value.items():
+                if name in properties:
+                    properties[name](item, _join(path, name), errors)
+                elif extra_check:
+                    extra_check(item, _join(path, name), errors)
+                elif extra is False:
+                    known = ", ".join(properties) or "none"
+                    errors.append(f"unexpected {_field(path, name)} (expected: {known})")
+            return True
+        checks.append(check_object)
+
+    if "items" in schema:
+        item_check = _compile(schema["items"])
+
+        def check_items(value, path, errors):
+            if isinstance(value, list):
+                for index, item in enumerate(value):
+                    item_check(item, f"{path}[{index}]", errors)
+            return True
+        checks.append(check_items)
+
+    if len(checks) == 1 and not nullable:
+        return checks[0]
+
+    def check(value, path, errors):
+        if value is None and nullable:
+            return
+        for step in checks:
+            if step(value, path, errors) is False:
+                return
+
+    return check
+
+
+def _compile_bounds(schema: dict) -> List[Callable]:
+    checks = []
+    for keyword, measure, compare, wording in (
+            ("minimum", None, lambda v, b: v >= b, "at least"),
+            ("maximum", None, lambda v, b: v <= b, "at most"),
+            ("minLength", len, lambda v, b: v >= b, "at least {} characters"),
+            ("maxLength", len, lambda v, b: v <= b, "at most {} characters"),
+            ("minItems", len, lambda v, b: v >= b, "at least {} items"),
+            ("maxItems", len, lambda v, b: v <= b, "at most {} items")):
+        if keyword not in schema:
+            continue
+        bound = schema[keyword]
+        applies = (lambda v: isinstance(v, (int, float)) and not isinstance(v, bool)) if measure is None \
+            else (lambda v: isinstance(v, str)) if "Length" in keyword \
+            else (lambda v: isinstance(v, list))
+
+        def check_bound(value, path, errors, bound=bound, measure=measure, compare=compare,
+                        wording=wording, applies=applies):
+            if applies(value) and not compare(measure(value) if measure else value, bound):
+                message = wording.format(bound) if "{}" in wording else f"{wording} {bound}"
+                errors.append(f"{_where(path)}must be {message}")
+                return False
+            return True
+        checks.append(check_bound)
+    return checks
+
+
+def _join(path: str, name: str) -> str:
+    return f"{path}.{name}" if path else name
+
+
+def _where(path: str) -> str:
+    return f"'{path}': " if path else ""
+
+
+def _field(path: str, name: str) -> str:
+    return f"field '{_join(path, name)}'" if path else f"argument '{name}'"
+
+
+def _describe(value) -> str:
+    if value is None:
+        return "null"
+    kind = _JSON_NAMES.get(type(value), type(value).__name__)
+    text = repr(value)
+    return f"{kind} {text[:40] + '...' if len(text) > 40 else text}"
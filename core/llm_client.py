@@ -1,38 +1,214 @@
 
+import functools
 import json
 import os
+import threading
+import time
+from typing import Iterator
 from litellm import completion
 from core.prompt import Prompt
 
+DEFAULT_MODEL = 'gemini/gemini-2.5-flash'
+
+
+@functools.lru_cache(maxsize=None)
+def structured_output_support(model: str) -> str:
+    """
+    How a model can be held to JSON output natively, looked up once per model.
+
+    Returns:
+        "schema" if it accepts a JSON schema as response_format, "json" if it only
+        has a plain JSON mode, None if neither
+    """
+    try:
+        import litellm
+        if litellm.supports_response_schema(model=model):
+            return "schema"
+        if "response_format" in (litellm.get_supported_openai_params(model=model) or []):
+            return "json"
+    except Exception:
+        pass
+    return None
+
+
+def _response_format_for(model: str, requested: dict):
+    support = structured_output_support(model) if requested else None
+    if support == "schema":
+        return requested
+    if support == "json":
+        return {"type": "json_object"}
+    return None
+
+
+# One keep-alive session per process, installed as litellm.client_session the
+# first time a client is created; the client making a call is tracked per
+# thread so connection events are attributed to it
+_session = None
+_session_lock = threading.Lock()
+_calling = threading.local()
+
+
+def _shared_http_client(max_connections: int, keepalive_expiry: float):
+    """
+    The process-wide keep-alive httpx client, with hooks that trace TCP connect
+    and TLS handshake time for the client making the call. None without httpx,
+    or if litellm.client_session was already set to something else.
+    """
+    global _session
+    with _session_lock:
+        if _session is not None:
+            return _session
+        try:
+            import httpx
+            import litellm
+        except ImportError:
+            return None
+        if getattr(litellm, "client_session", None) is not None:
+            return None
+
+        def trace_request(request):
+            client = getattr(_calling, "client", None)
+            if client is not None:
+                client._count_request()
+                request.extensions["trace"] = client._trace
+
+        _session = httpx.Client(
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_connections,
+                                keepalive_expiry=keepalive_expiry),
+            timeout=httpx.Timeout(600.0, connect=10.0),
+            event_hooks={"request": [trace_request]},
+        )
+        litellm.client_session = _session
+        return _session
+
 
 class LLMClient:
+    """
+    Client for the configured LLM. Configuration is resolved once, when the client
+    is created, and HTTP connections are kept alive and reused between calls;
+    share one instance (see get_default_client) so every caller benefits.
+
+    All clients share one connection pool, installed as litellm.client_session
+    by the first client; its pool settings apply to the others too.
+
+    Args:
+        model: litellm model name; defaults to $LLM_MODEL
+        max_tokens: Response token limit; defaults to $MAX_TOKENS
+        max_connections: Size of the keep-alive connection pool
+        keepalive_expiry: Seconds an idle connection is kept open
+    """
+
+    def __init__(self,
+                 model: str = None,
+                 max_tokens: int = None,
+                 max_connections: int = 20,
+                 keepalive_expiry: float = 120.0):
+        self.model = model or os.getenv('LLM_MODEL', DEFAULT_MODEL)
+        self.max_tokens = max_tokens or int(os.getenv('MAX_TOKENS', 60000))
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = {"calls": 0, "failed": 0, "latency_total": 0.0, "first_token_total": 0.0,
+                       "streamed": 0, "traced_requests": 0, "connections_opened": 0,
+                       "connect_seconds": 0.0, "tls_seconds": 0.0}
+        self.http_client = _shared_http_client(max_connections, keepalive_expiry)
+
+    def _completion(self, **kwargs):
+        # Mark this client as the caller, so the shared session's trace hook reports to it
+        previous = getattr(_calling, "client", None)
+        _calling.client = self
+        try:
+            return completion(**kwargs)
+        finally:
+            _calling.client = previous
+
+    def _count_request(self):
+        with self._lock:
+            self._stats["traced_requests"] += 1
+
+    def _trace(self, event: str, info: dict):
+        # httpcore reports "<step>.started" / "<step>.complete" pairs per request
+        step, _, phase = event.rpartition(".")
+        if step not in ("connection.connect_tcp", "connection.start_tls"):
+            return
+        if phase == "started":
+            self._local.started = time.perf_counter()
+        elif phase == "complete":
+            elapsed = time.perf_counter() - getattr(self._local, "started", time.perf_counter())
+            with self._lock:
+                if step == "connection.connect_tcp":
+                    self._stats["connections_opened"] += 1
+                    self._stats["connect_seconds"] += elapsed
+                else:
+                    self._stats["tls_seconds"] += elapsed
+
+    def _record(self, start: float, first_token: float = None, failed: bool = False):
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["latency_total"] += time.perf_counter() - start
+            if failed:
+                self._stats["failed"] += 1
+            if first_token is not None:
+                self._stats["streamed"] += 1
+                self._stats["first_token_total"] += first_token - start
+
+    def stats(self) -> dict:
+        """
+        Call latency and connection setup cost so far; setup per call falls as connections are reused.
+
+        The connection figures cover only requests that went through the shared
+        session; they are None while no request has (no httpx, or a provider
+        path that does not use litellm.client_session), rather than a made-up 100% reuse.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        calls = stats["calls"] or 1
+        stats["latency_avg"] = stats["latency_total"] / calls
+        stats["first_token_avg"] = stats["first_token_total"] / stats["streamed"] if stats["streamed"] else None
+        traced = stats["traced_requests"]
+        if not traced:
+            stats["connection_setup_per_call"] = stats["connection_reuse_rate"] = None
+        else:
+            stats["connection_setup_per_call"] = (stats["connect_seconds"] + stats["tls_seconds"]) / traced
+            stats["connection_reuse_rate"] = 1 - min(1.0, stats["connections_opened"] / traced)
+        return stats
 
-    
     def generate_response(self, prompt: Prompt) -> str:
-    
-        MODEL = os.getenv('LLM_MODEL', 'gemini/gemini-2.5-flash')
-        MAX_TOKENS = int(os.getenv('MAX_TOKENS', 60000))
         """Call LLM to get response"""
+        start = time.perf_counter()
+        try:
+            result = self._generate(prompt)
+        except Exception:
+            self._record(start, failed=True)
+            raise
+        self._record(start)
+        return result
 
+    def _generate(self, prompt: Prompt) -> str:
         messages = prompt.messages
         tools = prompt.tools
 
         result = None
 
         if not tools:
-            response = completion(
-                model=MODEL,
+            # Callers wanting JSON put a response_format in the metadata; it is
+            # passed on only if the model supports it (the prompt still asks for JSON)
+            response_format = _response_format_for(self.model, prompt.metadata.get("response_format"))
+            extra = {"response_format": response_format} if response_format else {}
+            response = self._completion(
+                model=self.model,
                 messages=messages,
-                max_tokens=MAX_TOKENS
+                max_tokens=self.max_tokens,
+                **extra
             )
             result = response.choices[0].message.content
         else:
             print("Using tools:", tools)
-            response = completion(
-                model=MODEL,
+            response = self._completion(
+                model=self.model,
                 messages=messages,
                 tools=tools,
-                max_tokens=MAX_TOKENS,
+                max_tokens=self.max_tokens,
             )
 
             if response.choices[0].message.tool_calls:
@@ -47,3 +223,45 @@ class LLMClient:
 
 
         return result
+
+    def stream_response(self, prompt: Prompt) -> Iterator[str]:
+        """Call LLM and yield the response text piece by piece as it is generated"""
+        start = time.perf_counter()
+        first_token = None
+        try:
+            response = self._completion(
+                model=self.model,
+                messages=prompt.messages,
+                max_tokens=self.max_tokens,
+                stream=True
+            )
+            for chunk in response:
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content
+                if text:
+                    first_token = first_token or time.perf_counter()
+                    yield text
+        except Exception:
+            self._record(start, first_token, failed=True)
+            raise
+        self._record(start, first_token)
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_default_client() -> LLMClient:
+    """The process-wide client shared by experts and tools that are not handed one."""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = LLMClient()
+        return _default_client
+
+
+def set_default_client(client: LLMClient):
+    global _default_client
+    with _default_lock:
+        _default_client = client
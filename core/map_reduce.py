@@ -0,0 +1,190 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+from core.tokens import estimate_tokens
+
+# Inputs above this many tokens are handled in parts rather than in one prompt
+MAP_REDUCE_THRESHOLD_TOKENS = int(os.getenv("MAP_REDUCE_THRESHOLD_TOKENS", 12000))
+CHUNK_TOKENS = int(os.getenv("MAP_REDUCE_CHUNK_TOKENS", 6000))
+MAX_PARALLEL_CHUNKS = int(os.getenv("MAP_REDUCE_MAX_PARALLEL", 4))
+
+PART_NOTE = "(This is part {index} of {count} of a larger input; cover what is in this part.)\n\n"
+MERGE_TEMPLATE = """The input was too large to handle at once, so it was split into {count} parts
+and each part was handled separately. The results for each part follow.
+
+{instruction}
+
+{parts}"""
+
+_FENCE = re.compile(r"^\s*```")
+_HEADING = re.compile(r"^#{1,6}\s")
+_DEFINITION = re.compile(
+    r"^\s{0,4}(?:(?:public|private|protected|export|abstract|final|static|async|default)\s+)*"
+    r"(?:class|interface|enum|record|def|function)\s+\w"
+)
+
+
+def split_semantic(text: str, max_tokens: int = CHUNK_TOKENS) -> List[str]:
+    """
+    Split text into chunks of at most max_tokens, cutting on semantic boundaries.
+
+    Markdown sections and fenced code blocks (one generated file each) are kept
+    whole where they fit and packed together into chunks. Anything larger is cut
+    at class/function definitions, then blank lines, then lines; a code block cut
+    this way keeps its opening and closing fence in every piece.
+    """
+    max_chars = max_tokens * 4
+    chunks, current = [], ""
+    for unit in _units(text):
+        pieces = [unit] if len(unit) <= max_chars else _split_large(unit, max_chars)
+        for piece in pieces:
+            if current and len(current) + len(piece) > max_chars:
+                chunks.append(current)
+                current = ""
+            current += piece
+    if current.strip():
+        chunks.append(current)
+    return chunks
+
+
+def _units(text: str) -> List[str]:
+    """Sections starting at headings and definitions, with each fenced block as its own unit."""
+    units, current, in_fence = [], [], False
+    for line in text.splitlines(keepends=True):
+        if _FENCE.match(line):
+            if not in_fence and current:
+                units.append("".join(current))
+                current = []
+            current.append(line)
+            if in_fence:
+                units.append("".join(current))
+                current = []
+            in_fence = not in_fence
+            continue
+        if not in_fence and current and (_HEADING.match(line) or _DEFINITION.match(line)):
+            units.append("".join(current))
+            current = []
+        current.append(line)
+    if current:
+        units.append("".join(current))
+    return units
+
+
+def _split_large(unit: str, max_chars: int) -> List[str]:
+    lines = unit.splitlines(keepends=True)
+    fenced = len(lines) > 1 and _FENCE.match(lines[0]) and _FENCE.match(lines[-1])
+    if fenced:
+        opening, closing, lines = lines[0], lines[-1], lines[1:-1]
+        budget = max(1, max_chars - len(opening) - len(closing))
+    else:
+        budget = max_chars
+
+    pieces = _cut(lines, budget, (_DEFINITION.match, lambda line: not line.strip(), lambda line: True))
+    return [opening + piece + closing for piece in pieces] if fenced else pieces
+
+
+def _cut(lines: List[str], budget: int, boundaries) -> List[str]:
+    """Greedily pack lines into pieces of at most budget chars, preferring the first boundary kind."""
+    if sum(len(line) for line in lines) <= budget:
+        return ["".join(lines)]
+    if not boundaries:
+        text = "".join(lines)
+        return [text[i:i + budget] for i in range(0, len(text), budget)]
+
+    is_boundary, rest = boundaries[0], boundaries[1:]
+    groups, current = [], []
+    for line in lines:
+        if current and is_boundary(line):
+            groups.append(current)
+            current = []
+        current.append(line)
+    groups.append(current)
+
+    pieces, current = [], ""
+    for group in groups:
+        for part in _cut(group, budget, rest) if sum(map(len, group)) > budget else ["".join(group)]:
+            if current and len(current) + len(part) > budget:
+                pieces.append(current)
+                current = ""
+            current += part
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def consult_with_map_reduce(description_of_expert: str,
+                            build_prompt: Callable[[str], str],
+                            text: str,
+                            merge_instruction: str,
+                            consult: Callable[[str, str], str],
+                            consult_part: Callable[[str, str], str] = None,
+                            threshold_tokens: int = None,
+                            chunk_tokens: int = None,
+                            max_parallel: int = None) -> str:
+    """
+    Ask an expert about text, in parts if it is too large for one prompt.
+
+    Below the threshold this is a single consult(description, build_prompt(text)).
+    Above it, the text is split with split_semantic, the parts are handled
+    concurrently (map) and their results are merged by one more call (reduce);
+    if the results are themselves too large, they are merged in rounds.
+
+    Args:
+        description_of_expert: The expert persona
+        build_prompt: Builds the prompt for a piece of input (or for all of it)
+        text: The input
+        merge_instruction: What the expert should do with the partial results
+        consult: Called as consult(description, prompt) for the single or final call
+        consult_part: Used for the map and intermediate merge calls; defaults to consult
+        threshold_tokens, chunk_tokens, max_parallel: Override the module defaults
+
+    Returns:
+        The expert's answer for the whole input
+    """
+    threshold = threshold_tokens or MAP_REDUCE_THRESHOLD_TOKENS
+    if estimate_tokens(text) <= threshold:
+        return consult(description_of_expert, build_prompt(text))
+
+    consult_part = consult_part or consult
+    chunks = split_semantic(text, chunk_tokens or CHUNK_TOKENS)
+    print(f"Input of ~{estimate_tokens(text)} tokens split into {len(chunks)} parts")
+
+    def handle(indexed):
+        index, chunk = indexed
+        note = PART_NOTE.format(index=index + 1, count=len(chunks))
+        return consult_part(description_of_expert, build_prompt(note + chunk))
+
+    with ThreadPoolExecutor(max_workers=max_parallel or MAX_PARALLEL_CHUNKS) as pool:
+        partials = list(pool.map(handle, enumerate(chunks)))
+
+        # Merge in rounds until the results fit in one prompt
+        while len(partials) > 1 and estimate_tokens("".join(partials)) > threshold:
+            groups = _group(partials, threshold)
+            if len(groups) == len(partials):  # each result alone fills a prompt; merge anyway
+                break
+            partials = list(pool.map(
+                lambda group: consult_part(description_of_expert, _merge_prompt(merge_instruction, group)),
+                groups))
+
+    return consult(description_of_expert, _merge_prompt(merge_instruction, partials))
+
+
+def _group(partials: List[str], threshold: int) -> List[List[str]]:
+    groups, current, size = [], [], 0
+    for partial in partials:
+        tokens = estimate_tokens(partial)
+        if current and size + tokens > threshold:
+            groups.append(current)
+            current, size = [], 0
+        current.append(partial)
+        size += tokens
+    groups.append(current)
+    return groups
+
+
+def _merge_prompt(instruction: str, partials: List[str]) -> str:
+    parts = "\n\n".join(f"### Part {i + 1} of {len(partials)}\n\n{partial}"
+                        for i, partial in enumerate(partials))
+    return MERGE_TEMPLATE.format(count=len(partials), instruction=instruction, parts=parts)
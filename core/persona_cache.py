@@ -0,0 +1,111 @@
+import json
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset("""
+a an and are as at be been but by can could do does for from has have how i if in into is it its
+me my need needs of on or our should so that the their them there these this those to us was we
+were what when which while who why will with would you your
+""".split())
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase words only, so spacing, case and punctuation do not change a key."""
+    return " ".join(_WORD.findall(text.lower()))
+
+
+def problem_class(problem: str, max_terms: int = 8) -> str:
+    """
+    A coarse signature of a problem: its most frequent content words, sorted.
+    Rephrasings of the same problem usually share it, so they share a persona.
+    """
+    words = [w for w in _WORD.findall(problem.lower()) if w not in _STOPWORDS and len(w) > 2]
+    return " ".join(sorted(word for word, _ in Counter(words).most_common(max_terms)))
+
+
+class PersonaCache:
+    """
+    Bounded LRU of generated expert personas and consultation prompts, persisted
+    as JSON so they survive restarts.
+
+    Personas are keyed by (domain, problem_class(problem)), consultation prompts by
+    (domain, normalized problem): a related problem in the same domain reuses the
+    persona, and a repeated problem reuses both.
+    """
+
+    def __init__(self, max_entries: int = 256, persist_path: str = ".expert_personas.json"):
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self._entries = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def persona_key(domain: str, problem: str) -> str:
+        return f"persona|{normalize_text(domain)}|{problem_class(problem)}"
+
+    @staticmethod
+    def prompt_key(domain: str, problem: str) -> str:
+        return f"prompt|{normalize_text(domain)}|{normalize_text(problem)}"
+
+    def get(self, key: str):
+        with self._lock:
+            entries = self._load()
+            value = entries.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: str):
+        with self._lock:
+            entries = self._load()
+            entries[key] = value
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+            self._save(entries)
+
+    def _load(self) -> OrderedDict:
+        if self._entries is None:
+            self._entries = OrderedDict()
+            if self.persist_path and os.path.exists(self.persist_path):
+                try:
+                    with open(self.persist_path, "r") as f:
+                        self._entries.update(json.load(f))
+                except (OSError, ValueError) as e:
+                    print(f"Ignoring unreadable persona cache {self.persist_path}: {e}")
+        return self._entries
+
+    def _save(self, entries: OrderedDict):
+        if not self.persist_path:
+            return
+        # Written in LRU order, so the order survives a restart
+        tmp = self.persist_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(list(entries.items()), f)
+        os.replace(tmp, self.persist_path)
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_persona_cache() -> PersonaCache:
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = PersonaCache()
+        return _default_cache
+
+
+def set_persona_cache(cache: PersonaCache):
+    global _default_cache
+    with _default_lock:
+        _default_cache = cache
@@ -0,0 +1,358 @@
+import importlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import forkserver, shared_memory
+from typing import Any, Iterable
+
+from core.action import Action
+from core.tool_executor import ToolTimeoutError
+
+# bytes payloads at least this large travel through shared memory instead of the pipe
+SHARED_MEMORY_THRESHOLD = 1024 * 1024
+
+
+class SharedBytes:
+    """Picklable reference to a bytes payload placed in a shared memory block."""
+    __slots__ = ("name", "size")
+
+    def __init__(self, name: str, size: int):
+        self.name = name
+        self.size = size
+
+    @classmethod
+    def put(cls, data: bytes) -> "SharedBytes":
+        block = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+        block.buf[:len(data)] = data
+        ref = cls(block.name, len(data))
+        block.close()
+        return ref
+
+    def take(self, unlink: bool) -> bytes:
+        block = shared_memory.SharedMemory(name=self.name)
+        try:
+            return bytes(block.buf[:self.size])
+        finally:
+            block.close()
+            if unlink:
+                block.unlink()
+
+    def discard(self):
+        try:
+            block = shared_memory.SharedMemory(name=self.name)
+        except FileNotFoundError:
+            return
+        block.close()
+        block.unlink()
+
+
+def _pack(value: Any, threshold: int):
+    if isinstance(value, (bytes, bytearray, memoryview)) and len(value) >= threshold:
+        return SharedBytes.put(bytes(value))
+    if isinstance(value, dict):
+        return {k: _pack(v, threshold) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_pack(v, threshold) for v in value)
+    return value
+
+
+def _unpack(value: Any, unlink: bool):
+    if isinstance(value, SharedBytes):
+        return value.take(unlink)
+    if isinstance(value, dict):
+        return {k: _unpack(v, unlink) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_unpack(v, unlink) for v in value)
+    return value
+
+
+def _refs(value: Any):
+    if isinstance(value, SharedBytes):
+        yield value
+    elif isinstance(value, dict):
+        for v in value.values():
+            yield from _refs(v)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            yield from _refs(v)
+
+
+def _init_worker(modules: Iterable[str], memory_limit_mb: int):
+    if memory_limit_mb:
+        import resource
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    for module in modules:
+        importlib.import_module(module)
+
+
+def _run_tool(module: str, tool_name: str, args: dict, threshold: int):
+    from core.tool_decorator import tools
+    importlib.import_module(module)
+    # The parent owns (and unlinks) the argument blocks
+    result = tools[tool_name]["function"](**_unpack(args, unlink=False))
+    return _pack(result, threshold)
+
+
+def _serve(conn, modules: Iterable[str], memory_limit_mb: int):
+    """Worker process main loop: run (function, args) requests from conn until it is closed."""
+    _init_worker(modules, memory_limit_mb)
+    while True:
+        try:
+            function, args = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            outcome = ("ok", function(*args))
+        except BaseException as e:
+            outcome = ("error", e)
+        try:
+            conn.send(outcome)
+        except Exception as e:  # e.g. an exception that cannot be pickled
+            conn.send(("error", RuntimeError(f"{type(outcome[1]).__name__}: {outcome[1]} ({e})")))
+
+
+def _warm():
+    return os.getpid()
+
+
+class _Worker:
+    """One sandbox worker process and the pipe its calls go over."""
+
+    def __init__(self, context, modules: Iterable[str], memory_limit_mb: int):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child, tuple(modules), memory_limit_mb),
+                                       daemon=True)
+        self.process.start()
+        child.close()
+        self.calls = 0
+        _count_live(1)
+
+    def call(self, function, args: tuple, timeout: float = None):
+        """Run function(*args) in the worker; returns its (status, value) reply, or None on timeout."""
+        self.conn.send((function, args))
+        if not self.conn.poll(timeout):
+            return None
+        self.calls += 1
+        return self.conn.recv()
+
+    def stop(self, kill: bool = False):
+        """Let the worker exit by closing its pipe, or kill it, and wait for it to go."""
+        if kill:
+            self.process.kill()
+        self.conn.close()
+        self.process.join(timeout=1)
+        if self.process.exitcode is not None:
+            _count_live(-1)
+
+
+# Modules the running forkserver was started with (None until it starts), and
+# how many workers it has running; it can only be restarted while it has none
+_preloaded = None
+_live = 0
+_forkserver_lock = threading.Lock()
+
+
+def _count_live(change: int):
+    global _live
+    with _forkserver_lock:
+        _live += change
+
+
+class ProcessSandbox:
+    """
+    Runs tools registered with isolation="process" in a pool of worker
+    processes, so CPU-bound work does not hold the agent's GIL and a crash or
+    runaway allocation only takes down a worker.
+
+    Workers come from a forkserver that has the tool modules preloaded, so a
+    new worker starts with them already imported. The preload list is every
+    module of a process-isolated tool registered by the time the first worker
+    starts; the server is restarted with a longer list when a module turns up
+    later and no worker is running (until then, new workers import it as they
+    start). Each worker runs under an address-space limit and is replaced
+    after max_tasks_per_child calls. A call that times out, or whose worker dies,
+    only costs that worker: it is killed and replaced while the others carry
+    on. Large bytes arguments and results go through shared memory.
+
+    Arguments must be picklable: process-isolated tools cannot receive
+    action_context or other live objects.
+    """
+
+    def __init__(self,
+                 max_workers: int = None,
+                 modules: Iterable[str] = (),
+                 memory_limit_mb: int = 2048,
+                 max_tasks_per_child: int = 100,
+                 shared_memory_threshold: int = SHARED_MEMORY_THRESHOLD):
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self.modules = list(modules)
+        self.memory_limit_mb = memory_limit_mb
+        self.max_tasks_per_child = max_tasks_per_child
+        self.shared_memory_threshold = shared_memory_threshold
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._idle = []
+        self._workers = 0
+        self._closed = False
+        self.recycled = 0
+
+    def start(self, warm: bool = True):
+        """Start the workers now (they are otherwise started on first use) and wait until they are ready."""
+        with self._lock:
+            self._closed = False
+            missing = self.max_workers - self._workers
+            self._workers += missing
+        started = [self._spawn() for _ in range(missing)]
+        for worker in started:
+            if warm:
+                worker.call(_warm, ())
+            self._release(worker)
+        return self
+
+    def run(self, action: Action, call_args: dict, timeout: float = None) -> Any:
+        module = action.function.__module__
+        if module == "__main__":
+            raise ValueError(f"Tool '{action.name}' is defined in __main__ and cannot run in a worker process")
+        if action.injection_plan.context:
+            raise ValueError(f"Tool '{action.name}' takes action_context and cannot run in a worker process")
+
+        self._ensure_module(module)
+        args = _pack(call_args, self.shared_memory_threshold)
+        try:
+            worker = self._checkout()
+            try:
+                reply = worker.call(_run_tool, (module, action.name, args, self.shared_memory_threshold),
+                                    timeout)
+            except (EOFError, OSError):
+                # The worker died, e.g. it hit the memory limit
+                self._replace(worker)
+                raise BrokenProcessPool(f"Worker for '{action.name}' exited unexpectedly") from None
+            except BaseException:
+                self._replace(worker)  # the pipe may hold half a request
+                raise
+            if reply is None:
+                self._replace(worker)
+                raise ToolTimeoutError(action.name, timeout)
+            self._release(worker)
+            status, value = reply
+            if status == "error":
+                raise value
+            return _unpack(value, unlink=True)
+        finally:
+            for ref in _refs(args):
+                ref.discard()
+
+    def shutdown(self):
+        """Stop the idle workers; busy ones stop when their call returns."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._workers -= len(idle)
+            self._available.notify_all()
+        for worker in idle:
+            worker.stop()
+
+    def _checkout(self) -> _Worker:
+        with self._lock:
+            self._closed = False  # used again after shutdown, like a new pool
+            while not self._idle and self._workers >= self.max_workers:
+                self._available.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._workers += 1
+        try:
+            return self._spawn()
+        except BaseException:
+            with self._lock:
+                self._workers -= 1
+                self._available.notify()
+            raise
+
+    def _release(self, worker: _Worker):
+        if worker.calls >= self.max_tasks_per_child:
+            worker.stop()
+            self._refill()
+            return
+        with self._lock:
+            if not self._closed:
+                self._idle.append(worker)
+                self._available.notify()
+                return
+            self._workers -= 1
+        worker.stop()
+
+    def _replace(self, worker: _Worker):
+        """Kill a worker that timed out or broke, and start a fresh one in its place."""
+        worker.stop(kill=True)
+        self.recycled += 1
+        self._refill()
+
+    def _refill(self):
+        # Its slot goes to a new worker, so the next call finds one already started
+        with self._lock:
+            if self._closed:
+                self._workers -= 1
+                self._available.notify()
+                return
+        try:
+            worker = self._spawn()
+        except BaseException:
+            with self._lock:
+                self._workers -= 1
+                self._available.notify()
+            raise
+        self._release(worker)
+
+    def _spawn(self) -> _Worker:
+        with self._lock:
+            modules = list(self.modules)
+        return _Worker(self._get_context(), modules, self.memory_limit_mb)
+
+    def _ensure_module(self, module: str):
+        if module not in self.modules:
+            # Workers started from now on import it up front; running ones import it on first call
+            with self._lock:
+                self.modules.append(module)
+
+    def _get_context(self):
+        """The forkserver context, with the server preloading every module the sandbox knows of."""
+        global _preloaded
+        context = multiprocessing.get_context("forkserver")
+        with self._lock:
+            wanted = set(self.modules) | _isolated_modules()
+        with _forkserver_lock:
+            if _preloaded is None or (not wanted <= _preloaded and _live == 0):
+                modules = sorted(wanted | (_preloaded or set()))
+                if _preloaded is not None:
+                    # The preload list is only read when the server starts
+                    forkserver._forkserver._stop()
+                context.set_forkserver_preload(modules)
+                _preloaded = set(modules)
+        return context
+
+
+def _isolated_modules() -> set:
+    """Modules of the tools registered so far with isolation="process"."""
+    from core.tool_decorator import tools
+    return {entry["function"].__module__ for entry in list(tools.values())
+            if entry.get("isolation") == "process"} - {"__main__"}
+
+
+_default_sandbox = None
+_default_lock = threading.Lock()
+
+
+def get_process_sandbox() -> ProcessSandbox:
+    global _default_sandbox
+    with _default_lock:
+        if _default_sandbox is None:
+            _default_sandbox = ProcessSandbox()
+        return _default_sandbox
+
+
+def set_process_sandbox(sandbox: ProcessSandbox):
+    global _default_sandbox
+    with _default_lock:
+        _default_sandbox = sandbox
@@ -1,11 +1,14 @@
+from typing import Iterator
 from core.action_context import ActionContext
-from core.llm_client import LLMClient
+from core.llm_client import LLMClient, get_default_client
 from core.prompt import Prompt
 from core.tool_decorator import register_tool
 
 
+# Not cacheable: the answer depends on the model behind action_context, and an
+# LLM call is neither deterministic nor the read-only kind of tool the cache is for
 @register_tool()
-def prompt_expert( description_of_expert: str, prompt: str) -> str:
+def prompt_expert( description_of_expert: str, prompt: str, action_context: ActionContext = None) -> str:
     """
     Generate a response from an expert persona.
     
@@ -16,17 +19,30 @@ def prompt_expert( description_of_expert: str, prompt: str) -> str:
     Args:
         description_of_expert: Detailed description of the expert's background and expertise
         prompt: The specific question or task for the expert
+        action_context: Supplies the LLMClient to use as "llm_client"; the shared one otherwise
         
     Returns:
         The expert's response
     """
-    
-    
-    prompt = Prompt(messages=[
-        {"role": "system", 
+    llm_client = expert_client(action_context)
+    response = llm_client.generate_response(expert_prompt(description_of_expert, prompt))
+    return response
+
+
+def expert_client(action_context: ActionContext = None) -> LLMClient:
+    client = action_context.get("llm_client") if action_context else None
+    return client or get_default_client()
+
+
+def expert_prompt(description_of_expert: str, prompt: str) -> Prompt:
+    return Prompt(messages=[
+        {"role": "system",
          "content": f"Act as the following expert and respond accordingly: {description_of_expert}"},
         {"role": "user", "content": prompt}
     ])
-    llm_client = LLMClient()
-    response = llm_client.generate_response(prompt)
-    return response
\ No newline at end of file
+
+
+def stream_expert(description_of_expert: str, prompt: str,
+                  action_context: ActionContext = None) -> Iterator[str]:
+    """Like prompt_expert, but yields the expert's response as it is generated."""
+    return expert_client(action_context).stream_response(expert_prompt(description_of_expert, prompt))
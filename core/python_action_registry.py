@@ -1,41 +1,78 @@
-from typing import List
+from typing import Dict, List
 from core.action_registry import ActionRegistry
-from core.tool_decorator import tools
+from core import tool_decorator
+from core.tool_decorator import tools, tools_by_tag
+from core.tool_manifest import load_tools
 from core.action import Action
 
-class PythonActionRegistry(ActionRegistry):
-    def __init__(self, tags: List[str] = None, tool_names: List[str] = None):
-        super().__init__()
+# One Action per registered tool, shared by every registry and agent.
+# Keyed by tool name; an entry is reused while tools[name] is the same entry.
+_snapshots = {}
+
+# Resolved tag/name queries: (tags, tool_names) -> (tools_generation, {name: Action})
+_queries = {}
+
+
+def get_action_snapshot(tool_name: str) -> Action:
+    """Return the shared Action for a registered tool. Callers must not mutate it."""
+    entry = tools[tool_name]
+    cached = _snapshots.get(tool_name)
+    if cached is not None and cached[0] is entry:
+        return cached[1]
+
+    action = Action(
+        name=tool_name,
+        function=entry["function"],
+        description=entry["description"],
+        parameters=entry.get("parameters", {}),
+        terminal=entry.get("terminal", False),
+        cacheable=entry.get("cacheable", False),
+        ttl=entry.get("ttl"),
+        cache_key=entry.get("cache_key"),
+        timeout=entry.get("timeout"),
+        max_concurrency=entry.get("max_concurrency"),
+        isolation=entry.get("isolation")
+    )
+    action.injection_plan
+    _snapshots[tool_name] = (entry, action)
+    return action
 
-        self.terminate_tool = None
 
-        for tool_name, tool_desc in tools.items():
-            if tool_name == "terminate":
-                self.terminate_tool = tool_desc
+def _select(tags: List[str], tool_names: List[str]) -> Dict[str, Action]:
+    key = (tuple(tags or ()), tuple(tool_names or ()))
+    cached = _queries.get(key)
+    if cached is not None and cached[0] == tool_decorator.tools_generation:
+        return cached[1]
 
-            if tool_names and tool_name not in tool_names:
-                continue
+    if tags:
+        # Served from the tag index; the union keeps the order tags were given in
+        names = dict.fromkeys(name for tag in tags for name in tools_by_tag.get(tag, ()))
+        if tool_names:
+            wanted = set(tool_names)
+            names = [name for name in names if name in wanted]
+    elif tool_names:
+        names = [name for name in dict.fromkeys(tool_names) if name in tools]
+    else:
+        names = tools
+
+    actions = {name: get_action_snapshot(name) for name in names}
+    _queries[key] = (tool_decorator.tools_generation, actions)
+    return actions
+
+
+class PythonActionRegistry(ActionRegistry):
+    def __init__(self, tags: List[str] = None, tool_names: List[str] = None):
+        super().__init__()
 
-            tool_tags = tool_desc.get("tags", [])
-            if tags and not any(tag in tool_tags for tag in tags):
-                continue
+        # Import only the modules that provide the requested tools
+        if tags or tool_names:
+            load_tools(tags=tags, tool_names=tool_names)
 
-            self.register(Action(
-                name=tool_name,
-                function=tool_desc["function"],
-                description=tool_desc["description"],
-                parameters=tool_desc.get("parameters", {}),
-                terminal=tool_desc.get("terminal", False)
-            ))
+        self.terminate_tool = tools.get("terminate")
+        self.actions = dict(_select(tags, tool_names))
 
     def register_terminate_tool(self):
         if self.terminate_tool:
-            self.register(Action(
-                name="terminate",
-                function=self.terminate_tool["function"],
-                description=self.terminate_tool["description"],
-                parameters=self.terminate_tool.get("parameters", {}),
-                terminal=self.terminate_tool.get("terminal", False)
-            ))
+            self.register(get_action_snapshot("terminate"))
         else:
-            raise Exception("Terminate tool not found in tool registry")
\ No newline at end of file
+            raise Exception("Terminate tool not found in tool registry")
@@ -0,0 +1,86 @@
+import mmap
+import os
+
+# Upper bound on what a single ranged read returns unless the caller asks otherwise
+DEFAULT_MAX_BYTES = 64 * 1024
+
+
+def read_range(path: str,
+               start: int = None,
+               end: int = None,
+               start_line: int = None,
+               end_line: int = None,
+               max_bytes: int = DEFAULT_MAX_BYTES,
+               encoding: str = "utf-8") -> str:
+    """
+    Read part of a file through a memory map, so only the requested slice is
+    copied into the process heap.
+
+    Args:
+        path: The file to read
+        start: First byte offset to return (inclusive, defaults to 0)
+        end: Byte offset to stop at (exclusive, defaults to end of file)
+        start_line: First line to return, 1-based; byte offsets then apply within the lines
+        end_line: Last line to return, 1-based and inclusive
+        max_bytes: Cap on the number of bytes returned (None for no cap)
+        encoding: Text encoding of the file
+
+    Returns:
+        The decoded slice; a note is appended when max_bytes cut it short
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return ""
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        lo, hi = 0, size
+        if start_line is not None or end_line is not None:
+            lo, hi = line_span(mm, start_line or 1, end_line)
+        # Byte offsets are relative to the selected lines, if any
+        base = lo
+        if end is not None:
+            hi = min(hi, base + max(0, end))
+        if start is not None:
+            lo = min(hi, base + max(0, start))
+        hi = max(lo, hi)
+
+        truncated = max_bytes is not None and hi - lo > max_bytes
+        if truncated:
+            hi = lo + max_bytes
+        text = mm[lo:hi].decode(encoding, errors="replace")
+
+    if truncated:
+        text += f"\n...[truncated at {max_bytes} bytes of {size}; request a narrower range]"
+    return text
+
+
+def line_span(mm, start_line: int, end_line: int = None):
+    """Byte offsets [lo, hi) covering lines start_line..end_line (1-based, inclusive)."""
+    lo = 0
+    for _ in range(max(0, start_line - 1)):
+        nl = mm.find(b"\n", lo)
+        if nl == -1:
+            return len(mm), len(mm)
+        lo = nl + 1
+    if end_line is None:
+        return lo, len(mm)
+    hi = lo
+    for _ in range(max(0, end_line - start_line + 1)):
+        nl = mm.find(b"\n", hi)
+        if nl == -1:
+            return lo, len(mm)
+        hi = nl + 1
+    return lo, hi
+
+
+def count_lines(path: str) -> int:
+    size = os.path.getsize(path)
+    if size == 0:
+        return 0
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        lines = 0
+        pos = mm.find(b"\n")
+        while pos != -1:
+            lines += 1
+            pos = mm.find(b"\n", pos + 1)
+        return lines + (0 if mm[size - 1:size] == b"\n" else 1)
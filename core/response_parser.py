@@ -0,0 +1,269 @@
+import json
+import re
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from core.action_plan import PLAN_TOOL_NAME
+
+_FENCE = re.compile(r"```[ \t]*([\w-]*)[^\n]*\n(.*?)(?:```|$)", re.DOTALL)
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_CLOSERS = {"{": "}", "[": "]"}
+
+# Recovery scans at most this many times the candidate's length (plus a floor),
+# so text full of unbalanced braces and quotes cannot make it quadratic
+SCAN_BUDGET_FACTOR = 4
+MIN_SCAN_BUDGET = 64 * 1024
+
+
+class ResponseParseError(ValueError):
+    """Raised when no tool invocation can be recovered from an LLM response."""
+
+
+class TruncatedResponseError(ResponseParseError):
+    """
+    Raised when the only object found was cut off and had to be closed by the
+    repair, so its last values may be half-written; partial holds what was
+    recovered. The caller should ask again rather than act on it.
+    """
+
+    def __init__(self, message: str, partial: dict):
+        super().__init__(message)
+        self.partial = partial
+
+
+def is_tool_invocation(value) -> bool:
+    """A {"tool": ..., "args": ...} invocation, or a {"plan": [...]} of several (see core.action_plan)."""
+    return isinstance(value, dict) and (isinstance(value.get("tool"), str)
+                                        or isinstance(value.get("plan"), list))
+
+
+def _as_invocation(value: dict) -> dict:
+    if "tool" not in value and isinstance(value.get("plan"), list):
+        return {"tool": PLAN_TOOL_NAME, "args": {"steps": value["plan"]}}
+    args = value.get("args")
+    if args is None:
+        # A tool that takes no arguments is often called without "args"
+        return {**value, "args": {}}
+    if not isinstance(args, dict):
+        raise ResponseParseError(
+            f"The arguments of tool '{value['tool']}' must be a JSON object, not {type(args).__name__}")
+    return value
+
+
+def parse_tool_invocation(response: str,
+                          accept: Callable[[dict], bool] = is_tool_invocation) -> dict:
+    """
+    Pull the first well-formed tool invocation out of an LLM response.
+
+    The response may be bare JSON, JSON inside a markdown fence (```action,
+    ```json or untagged), JSON surrounded by prose, or output that was cut off
+    mid-object. Common defects are repaired locally: trailing commas, unclosed
+    braces and strings, single-quoted strings, raw newlines inside strings and
+    Python literals (True/False/None).
+
+    Args:
+        response: The raw LLM output
+        accept: Predicate deciding whether a decoded object is an invocation
+
+    Returns:
+        The decoded invocation, always with an "args" object ({} if it had
+        none); a {"plan": [...]} object comes back as an invocation of the
+        execute_plan pseudo-tool
+
+    Raises:
+        TruncatedResponseError: If the only invocation found was cut off, so its
+            arguments may be incomplete (it is not returned, to avoid running a
+            tool with e.g. half a file's content)
+        ResponseParseError: If no acceptable object can be recovered, or its
+            "args" is not an object
+    """
+    return _as_invocation(_recover(response, accept, "tool invocation"))
+
+
+def parse_json_object(response: str) -> dict:
+    """
+    Pull the first JSON object out of an LLM response, with the same fence
+    handling and local repairs as parse_tool_invocation.
+
+    Raises:
+        TruncatedResponseError: If the only object found was cut off
+        ResponseParseError: If no object can be recovered
+    """
+    return _recover(response, lambda value: isinstance(value, dict), "JSON object")
+
+
+def _recover(response: str, accept: Callable[[dict], bool], wanted: str) -> dict:
+    if not response or not response.strip():
+        raise ResponseParseError("Response is empty")
+
+    text = response.strip()
+
+    # Fast path: the whole response is already valid JSON
+    try:
+        value = json.loads(text)
+        found = _find_accepted(value, accept)
+        if found is not None:
+            return found
+    except ValueError:
+        pass
+
+    truncated = None
+    for candidate in _candidates(text):
+        for value, complete in _iter_objects(candidate):
+            found = _find_accepted(value, accept)
+            if found is None:
+                continue
+            if complete:
+                return found
+            truncated = truncated or found
+
+    if truncated is not None:
+        raise TruncatedResponseError(
+            f"The response was cut off in the middle of the {wanted}, so its values may be "
+            f"incomplete: {text[-200:]!r}", truncated)
+    raise ResponseParseError(f"No {wanted} found in response: {text[:200]!r}")
+
+
+def _candidates(text: str) -> Iterator[str]:
+    """Fenced blocks first (```action before others), then the whole text."""
+    fenced = [(tag.lower(), body) for tag, body in _FENCE.findall(text)]
+    for preferred in ("action", "json"):
+        for tag, body in fenced:
+            if tag == preferred:
+                yield body
+    for tag, body in fenced:
+        if tag not in ("action", "json"):
+            yield body
+    yield text
+
+
+def _find_accepted(value, accept) -> Optional[dict]:
+    """Return value if accepted, else the first accepted object nested inside it."""
+    if isinstance(value, dict):
+        if accept(value):
+            return value
+        children = value.values()
+    elif isinstance(value, list):
+        children = value
+    else:
+        return None
+    for child in children:
+        found = _find_accepted(child, accept)
+        if found is not None:
+            return found
+    return None
+
+
+def _iter_objects(text: str) -> Iterator[Tuple[object, bool]]:
+    """
+    Yield (value, complete) for each top-level JSON object that can be recovered
+    from text, in order; complete is False if the text ended inside the object.
+    """
+    budget = SCAN_BUDGET_FACTOR * len(text) + MIN_SCAN_BUDGET
+    pos = text.find("{")
+    while pos != -1:
+        repairs, end, complete = _repair_from(text, pos)
+        budget -= end - pos
+        value = None
+        for repaired in repairs:
+            try:
+                value = json.loads(repaired)
+                break
+            except ValueError:
+                continue
+        if value is not None:
+            yield value, complete
+            pos = text.find("{", end)
+        elif budget <= 0:
+            return
+        else:
+            pos = text.find("{", pos + 1)
+
+
+def _repair_from(text: str, start: int) -> Tuple[List[str], int, bool]:
+    """
+    Scan a single JSON-ish value starting at text[start] (an opening brace) in
+    one pass, emitting a repaired copy. Returns (repairs, end_index, complete)
+    where repairs lists candidate texts to decode, best first (empty if the
+    braces are mismatched), and complete is False if the text ran out first.
+    """
+    out = []
+    stack = []
+    commas = []  # (position in out, open closers) at each comma, for truncated input
+    quote = None  # the quote character of the string we are inside, if any
+    i = start
+    n = len(text)
+
+    while i < n:
+        ch = text[i]
+
+        if quote:
+            if ch == "\\" and i + 1 < n:
+                nxt = text[i + 1]
+                # \' is not a JSON escape; inside a string it is just a quote
+                out.append("'" if nxt == "'" else ch + nxt)
+                i += 2
+                continue
+            if ch == quote:
+                out.append('"')
+                quote = None
+            elif ch == '"':
+                out.append('\\"')  # double quote inside a single-quoted string
+            elif ch == "\n":
+                out.append("\\n")
+            elif ch == "\r":
+                out.append("\\r")
+            elif ch == "\t":
+                out.append("\\t")
+            else:
+                out.append(ch)
+            i += 1
+            continue
+
+        if ch in "\"'":
+            quote = ch
+            out.append('"')
+        elif ch in "{[":
+            stack.append(_CLOSERS[ch])
+            out.append(ch)
+        elif ch in "}]":
+            if not stack or stack[-1] != ch:
+                return [], i + 1, True
+            stack.pop()
+            _strip_trailing_comma(out)
+            out.append(ch)
+            if not stack:
+                return ["".join(out)], i + 1, True
+        elif ch.isalpha():
+            j = i
+            while j < n and (text[j].isalnum() or text[j] == "_"):
+                j += 1
+            word = text[i:j]
+            out.append(_LITERALS.get(word, word))
+            i = j
+            continue
+        elif ch == ",":
+            commas.append((len(out), "".join(reversed(stack))))
+            out.append(ch)
+        else:
+            out.append(ch)
+        i += 1
+
+    # Ran out of input: the response was truncated, close what is open
+    if quote:
+        out.append('"')
+    _strip_trailing_comma(out)
+    tail = "".join(out).rstrip()
+    if tail.endswith(":"):
+        tail += "null"
+    repairs = [tail + "".join(reversed(stack))]
+    # A dangling key or half-written value: drop back to the last few commas
+    for pos, closers in reversed(commas[-3:]):
+        repairs.append("".join(out[:pos]) + closers)
+    return repairs, n, False
+
+
+def _strip_trailing_comma(out: list):
+    while out and out[-1] in " \t\r\n":
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
@@ -0,0 +1,194 @@
+from typing import Any, Optional
+
+from core.ranged_reader import DEFAULT_MAX_BYTES
+from core.serialization import LazyJson, dumps, render
+from core.tokens import estimate_tokens
+
+
+class ResultRenderingPolicy:
+    """
+    Decides how environment results stored in memory are rendered into prompts.
+
+    The latest result is sent in full up to max_chars. Every result that is
+    older has its budget halved per turn of age, down to min_chars, so a large
+    file read early in a run stops dominating every later prompt. Text over
+    budget keeps a head and a tail excerpt around a marker. A result that may
+    be elided is stored once, when it is recorded (see record); the marker
+    cites that artifact, which read_artifact can read.
+    Fields that only matter on the turn they were produced (traceback,
+    timestamp) are dropped from older results.
+
+    The default max_chars matches the read tools' cap (DEFAULT_MAX_BYTES plus
+    their truncation note), so a read is never cut down on the turn it is made;
+    JSON escaping and the result's other fields may add up to an eighth.
+    """
+
+    def __init__(self,
+                 max_chars: int = DEFAULT_MAX_BYTES + 256,
+                 min_chars: int = 600,
+                 head_ratio: float = 0.7,
+                 volatile_fields=("traceback", "timestamp"),
+                 store: "ArtifactStore" = None):
+        self.max_chars = max_chars
+        self.min_chars = min_chars
+        self.head_ratio = head_ratio
+        self.volatile_fields = tuple(volatile_fields)
+        self.store = store
+        self.original_chars = 0
+        self.rendered_chars = 0
+
+    def budget(self, age: int) -> int:
+        return max(self.min_chars, self.max_chars >> age)
+
+    def record(self, content: Any) -> Optional[str]:
+        """
+        Store a result that is large enough to be elided some day in the artifact
+        store. Called once, when the result is added to memory.
+
+        Returns:
+            The artifact id to keep with the memory item and pass to render,
+            or None if the result is always rendered in full
+        """
+        full = render(content)
+        if len(full) <= self.min_chars:
+            return None
+        # Imported here: core.artifact_store registers read_artifact, which only
+        # registries that ask for it should offer
+        from core.artifact_store import get_artifact_store
+        return (self.store or get_artifact_store()).put(full, summary="")["artifact"]
+
+    def render(self, content: Any, age: int, artifact: str = None) -> str:
+        """
+        Render one environment memory item.
+
+        Args:
+            content: The memory content (LazyJson, string or JSON value)
+            age: How many environment results are newer than this one (0 = latest)
+            artifact: The id record returned for this result, cited where text is elided
+        """
+        full = render(content)
+        budget = self.budget(age)
+        drop_volatile = age > 0 and bool(self.volatile_fields)
+
+        if len(full) <= self._allowance(budget) and not drop_volatile:
+            text = full
+        else:
+            key = (budget, drop_volatile)
+            views = content.views if isinstance(content, LazyJson) else {}
+            text = views.get(key)
+            if text is None:
+                text = views[key] = self._condense(content, full, budget, drop_volatile, artifact)
+
+        self.original_chars += len(full)
+        self.rendered_chars += len(text)
+        return text
+
+    def elide(self, text: str, budget: int, artifact: str = None) -> str:
+        """Head and tail of text within budget, around a marker pointing at the full result."""
+        if len(text) <= budget:
+            return text
+        head = int(budget * self.head_ratio)
+        tail = budget - head
+        omitted = len(text) - head - tail
+        where = f"; the full result is artifact {artifact}, read it with read_artifact" if artifact else ""
+        return (f"{text[:head]}\n...[{omitted} chars elided{where}]...\n"
+                f"{text[len(text) - tail:] if tail else ''}")
+
+    def _fit(self, text: str, budget: int, artifact: str = None) -> str:
+        """Elide a string payload so that its JSON-escaped form fits the budget."""
+        escaped = len(dumps(text))
+        if escaped <= budget:
+            return text
+        return self.elide(text, max(1, budget * len(text) // escaped), artifact)
+
+    @staticmethod
+    def _allowance(budget: int) -> int:
+        # Room for JSON escaping and the fields around a payload that fits the budget
+        return budget + budget // 8
+
+    def _condense(self, content: Any, full: str, budget: int, drop_volatile: bool,
+                  artifact: str = None) -> str:
+        value = content.value if isinstance(content, LazyJson) else None
+        if not isinstance(value, dict):
+            return self.elide(full, budget, artifact)
+
+        if drop_volatile:
+            value = {k: v for k, v in value.items() if k not in self.volatile_fields}
+
+        # Shrink the payload itself so the rendered result stays valid JSON
+        result = value.get("result")
+        if isinstance(result, str) and len(result) > budget:
+            value = {**value, "result": self._fit(result, budget, artifact)}
+        elif isinstance(result, dict):
+            share = max(self.min_chars // 4, budget // max(1, len(result)))
+            value = {**value, "result": {
+                k: self._fit(v, share, artifact) if isinstance(v, str) else v
+                for k, v in result.items()
+            }}
+
+        # A multi-step plan's result: shrink each step's result the same way
+        steps = value.get("plan")
+        if isinstance(steps, dict) and steps:
+            # leave room for each step's tool/status fields and the elision note
+            share = max(self.min_chars // 4, budget // len(steps) - 160)
+            value = {**value, "plan": {
+                k: {**v, "result": self._fit(v["result"], share, artifact)}
+                if isinstance(v, dict) and isinstance(v.get("result"), str) else v
+                for k, v in steps.items()
+            }}
+
+        text = dumps(value)
+        return self.elide(text, self._allowance(budget), artifact)
+
+    def savings(self) -> dict:
+        """Prompt tokens for environment results with and without this policy, so far."""
+        return {
+            "original_tokens": (self.original_chars + 3) // 4,
+            "rendered_tokens": (self.rendered_chars + 3) // 4,
+        }
+
+
+def _benchmark(transcript_dir: str = "."):
+    """
+    Replays a develop_feature run from the markdown files it leaves behind
+    (requirements.md, implementation.md, ...) and compares prompt tokens per
+    iteration with and without the rendering policy.
+    """
+    import os
+    from core.agent_function_language import AgentFunctionCallingActionLanguage
+    from core.memory import Memory
+
+    def read(name):
+        path = os.path.join(transcript_dir, name)
+        return open(path, encoding="utf-8").read() if os.path.exists(path) else ""
+
+    memory = Memory()
+    memory.add_memory({"type": "user", "content": "Implement the feedback submission feature"})
+    memory.add_memory({"type": "assistant",
+                       "content": '{"tool": "develop_feature", "args": {"feature_request": "..."}}'})
+    memory.add_memory({"type": "environment", "content": LazyJson({
+        "tool_executed": True,
+        "result": {key: read(f"{key}.md") for key in
+                   ("requirements", "architecture", "implementation", "tests", "documentation")},
+        "timestamp": "2025-01-01T00:00:00+0000"
+    })})
+    follow_ups = ["test_cases.md", "automation_tests.md", "load_tests.md", "implementation.md"]
+
+    verbatim = AgentFunctionCallingActionLanguage()
+    verbatim.result_policy = None
+    elided = AgentFunctionCallingActionLanguage()
+
+    print(f"{'iteration':>9} {'verbatim':>10} {'elided':>10} {'saved':>7}")
+    for iteration, name in enumerate(follow_ups, start=1):
+        memory.add_memory({"type": "assistant",
+                           "content": f'{{"tool": "read_project_file", "args": {{"name": "{name}"}}}}'})
+        memory.add_memory({"type": "environment", "content": LazyJson({
+            "tool_executed": True, "result": read(name), "timestamp": "2025-01-01T00:00:00+0000"
+        })})
+        before = sum(estimate_tokens(m["content"]) for m in verbatim.format_memory(memory))
+        after = sum(estimate_tokens(m["content"]) for m in elided.format_memory(memory))
+        print(f"{iteration:>9} {before:>10} {after:>10} {1 - after / max(1, before):>7.0%}")
+
+
+if __name__ == "__main__":
+    _benchmark()
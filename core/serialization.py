@@ -0,0 +1,134 @@
+import json
+import time
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the stdlib encoder is the fallback
+    orjson = None
+
+
+class JsonSerializer:
+    """Serializer backed by the standard library json module."""
+    name = "json"
+
+    def dumps(self, obj: Any, indent: bool = False) -> str:
+        if indent:
+            return json.dumps(obj, indent=2, default=str)
+        return json.dumps(obj, separators=(",", ":"), default=str)
+
+
+class OrjsonSerializer(JsonSerializer):
+    """Serializer backed by orjson, falling back to json for values orjson rejects."""
+    name = "orjson"
+
+    def dumps(self, obj: Any, indent: bool = False) -> str:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=str, option=option).decode("utf-8")
+        except (orjson.JSONEncodeError, TypeError):
+            # e.g. integers over 64 bits, which the stdlib handles
+            return super().dumps(obj, indent=indent)
+
+
+_serializer = OrjsonSerializer() if orjson else JsonSerializer()
+
+
+def get_serializer() -> JsonSerializer:
+    return _serializer
+
+
+def set_serializer(serializer: JsonSerializer):
+    """Replace the process-wide serializer (e.g. to force the stdlib backend)."""
+    global _serializer
+    _serializer = serializer
+
+
+def dumps(obj: Any, indent: bool = False) -> str:
+    """Serialize obj to a compact JSON string with the configured backend."""
+    return _serializer.dumps(obj, indent=indent)
+
+
+class LazyJson:
+    """
+    Wraps a value that will be rendered as JSON only when it is actually needed,
+    e.g. when a tool result stored in memory is placed into a prompt. The rendered
+    text is cached, so a result that is re-sent on every iteration is serialized once.
+    """
+    __slots__ = ("value", "_text", "views")
+
+    def __init__(self, value: Any):
+        self.value = value
+        self._text = None
+        # Condensed renderings of the value, keyed by whoever produced them
+        self.views = {}
+
+    def __str__(self) -> str:
+        if self._text is None:
+            self._text = dumps(self.value)
+        return self._text
+
+    def __repr__(self) -> str:
+        return f"LazyJson({self.value!r})"
+
+    def __bool__(self) -> bool:
+        return True
+
+    def __len__(self) -> int:
+        return len(str(self))
+
+    def __contains__(self, item) -> bool:
+        return item in str(self)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, LazyJson):
+            return self.value == other.value
+        if isinstance(other, str):
+            return str(self) == other
+        return NotImplemented
+
+    __hash__ = None
+
+
+def render(content: Any) -> str:
+    """Turn memory content (a string, LazyJson or any JSON value) into prompt text."""
+    if isinstance(content, str):
+        return content
+    return str(content) if isinstance(content, LazyJson) else dumps(content)
+
+
+def _benchmark(rows: int = 20000, repeat: int = 20):
+    result = {
+        "tool_executed": True,
+        "result": [
+            {"id": i, "name": f"file_{i}.py", "size": i * 31, "tags": ["a", "b"],
+             "content": "def f():\n    return 42\n" * 4}
+            for i in range(rows)
+        ],
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z")
+    }
+
+    def timed(label, fn):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        elapsed = (time.perf_counter() - start) / repeat
+        print(f"{label:<40} {elapsed * 1000:8.2f} ms")
+
+    timed("json.dumps (default separators)", lambda: json.dumps(result))
+    timed("json.dumps(indent=4)", lambda: json.dumps(result, indent=4))
+    timed("JsonSerializer.dumps (compact)", lambda: JsonSerializer().dumps(result))
+    if orjson:
+        timed("OrjsonSerializer.dumps", lambda: OrjsonSerializer().dumps(result))
+    timed("LazyJson (never rendered)", lambda: LazyJson(result))
+    lazy = LazyJson(result)
+    str(lazy)
+    timed("LazyJson (rendered, cached)", lambda: str(lazy))
+    print(f"compact size {len(dumps(result))} bytes vs "
+          f"default {len(json.dumps(result))} bytes")
+
+
+if __name__ == "__main__":
+    _benchmark()
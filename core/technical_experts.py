@@ -1,11 +1,77 @@
 import os
 import re
-from core.code_extractor import parse_markdown_and_create_structure
-from core.prompt_expert import prompt_expert
+import threading
+import time
+import hashlib
+from types import CodeType
+from typing import Callable, Dict, NamedTuple, Optional, Set, Tuple
+from core.artifact_store import ArtifactStore, get_artifact_store, store_artifact
+from core.code_extractor import CodeBlockStream
+from core.dag import run_dag
+from core.llm_client import DEFAULT_MODEL
+from core.map_reduce import consult_with_map_reduce
+from core.prompt_expert import prompt_expert, stream_expert
 from core.action_context import ActionContext
 from core.prompt import Prompt
 from core.tool_decorator import register_tool
 
+# Output sink of the stage running on the current thread, see run_stage
+_stage_output = threading.local()
+
+
+def consult_expert(description_of_expert: str, prompt: str) -> str:
+    """
+    Ask an expert. Inside a develop_feature stage the response is streamed: it
+    goes to the stage's output file, and code files are extracted from it, as it
+    is generated.
+    """
+    sink = getattr(_stage_output, "sink", None)
+    if sink is None:
+        return prompt_expert(description_of_expert, prompt)
+    for text in stream_expert(description_of_expert, prompt):
+        sink.write(text)
+    return sink.text()
+
+
+class StageOutput:
+    """
+    Writes a stage's response to its output file and code extractor while it streams in.
+
+    The text streams into "<output_file>.tmp", which replaces the output file
+    only when the stage completes; a failed stage leaves the previous document as it was.
+    """
+
+    def __init__(self, stage: "Stage", prune: bool = False):
+        self.stage = stage
+        self.chunks = []
+        self.temp_file = stage.output_file + ".tmp"
+        self.file = open(self.temp_file, "w", encoding="utf-8")
+        self.extractor = CodeBlockStream(source=stage.name, prune=prune) if stage.extract_code else None
+
+    def write(self, text: str):
+        self.chunks.append(text)
+        self.file.write(text)
+        self.file.flush()
+        if self.extractor:
+            self.extractor.feed(text)
+
+    def text(self) -> str:
+        return "".join(self.chunks)
+
+    def close(self, complete: bool = True):
+        """Returns the manifest of the code files written, if the stage has any."""
+        self.file.close()
+        if complete:
+            os.replace(self.temp_file, self.stage.output_file)
+            print(f"File '{self.stage.output_file}' written successfully.")
+        else:
+            os.remove(self.temp_file)
+        if self.extractor:
+            self.extractor.close(complete)
+            return self.extractor.manifest
+        return None
+
+
 # @register_tool(tags=["requirements"])
 def generate_detailed_requirements( code_or_feature: str) -> str:
     """
@@ -15,7 +81,7 @@ def generate_detailed_requirements( code_or_feature: str) -> str:
     Args:
         code_or_feature: The code or feature to document
     """
-    return prompt_expert(
+    return consult_expert(
         
         description_of_expert="""
         You are a senior product manager with extensive experience in translating feature requests into actionable requirements specifications.
@@ -49,7 +115,7 @@ def generate_architecture_document( code_or_feature: str) -> str:
     Args:
         code_or_feature: The code or feature to document
     """
-    return prompt_expert(
+    return consult_expert(
       
         description_of_expert="""
         You are a senior solution architect with deep expertise in cloud-native architectures and microservices design.
@@ -79,7 +145,7 @@ def implement_features(design_documentation: str) -> str:
     Args:
         code_or_feature: The code or feature to document
     """
-    return prompt_expert(
+    return consult_expert(
         
         description_of_expert="""
         You are a full stack senior developer with deep expertise in Java (Spring Boot) for backend and Angular for frontend development.
@@ -159,7 +225,7 @@ def generate_technical_documentation(code_or_feature: str) -> str:
     Args:
         code_or_feature: The code or feature to document
     """
-    return prompt_expert(
+    return consult_with_map_reduce(
         
         description_of_expert="""
         You are a senior technical writer with 15 years of experience in software documentation.
@@ -174,7 +240,7 @@ def generate_technical_documentation(code_or_feature: str) -> str:
         and clarity. You understand that good technical documentation serves as both
         a reference and a learning tool.
         """,
-        prompt=f"""
+        build_prompt=lambda code_or_feature: f"""
         Please create comprehensive technical documentation for the following code or feature:
 
         {code_or_feature}
@@ -189,7 +255,10 @@ def generate_technical_documentation(code_or_feature: str) -> str:
         
         Focus on providing information that developers need to effectively understand
         and work with this code.
-        """
+        """,
+        text=code_or_feature,
+        merge_instruction="Combine these partial documents into one coherent technical document with a single overview, merging overlapping sections and removing repetition.",
+        consult=consult_expert
     )
 
 # @register_tool(tags=["testing"])
@@ -201,7 +270,7 @@ def design_test_suite(feature_description: str) -> str:
     Args:
         feature_description: Description of the feature to test
     """
-    return prompt_expert(
+    return consult_with_map_reduce(
       
         description_of_expert="""
         You are a senior QA engineer with 12 years of experience in test design and automation.
@@ -216,7 +285,7 @@ def design_test_suite(feature_description: str) -> str:
         that others might miss. Your test suites are known for their thoroughness and
         their ability to catch issues early in the development cycle.
         """,
-        prompt=f"""
+        build_prompt=lambda feature_description: f"""
         Please design a comprehensive test suite for the following feature:
 
         {feature_description}
@@ -234,7 +303,10 @@ def design_test_suite(feature_description: str) -> str:
         - Expected outcomes
         - Important edge cases to consider
         - Potential testing challenges
-        """
+        """,
+        text=feature_description,
+        merge_instruction="Combine these partial test designs into one test suite organized by test category, merging duplicate scenarios.",
+        consult=consult_expert
     )
 
 def generate_test_cases(test_strategy: str) -> str:
@@ -244,7 +316,7 @@ def generate_test_cases(test_strategy: str) -> str:
     Args:
         test_description: Description of the feature or code to test
     """
-    return prompt_expert(
+    return consult_expert(
         description_of_expert="""
         You are a senior QA engineer with expertise in test case design and automation.
         You excel at creating comprehensive test cases that cover both functional and non-functional requirements.
@@ -320,7 +392,7 @@ def develop_automation_tests(test_strategy: str) -> str:
     Args:
         test_description: Description of the test strategy to implement
     """
-    return prompt_expert(
+    return consult_expert(
         description_of_expert="""
         I am an Automation QA Expert with over a decade of experience in designing and implementing automated test frameworks for web and mobile applications. I specialize in JavaScript-based automation using WebdriverIO, with a strong focus on integrating testing tools like Sealights to optimize test execution and improve code coverage analysis. My task is to create a comprehensive automation test pack for a web application using WebdriverIO, integrated with Sealights for test optimization, based on the test case specification provided below. The application is a modern web app built with a JavaScript framework (e.g., React, Angular, or Vue.js), and the test pack will ensure robust end-to-end (E2E) testing, including edge cases and performance considerations.        """,
         prompt=f"""
@@ -377,7 +449,7 @@ def develop_load_tests(test_strategy: str) -> str:
     Args:
         test_description: Description of the test strategy to implement
     """
-    return prompt_expert(
+    return consult_expert(
         description_of_expert="""
        I am a Load Test Engineer with extensive experience in performance testing and optimization, specializing in Apache JMeter for designing and executing load tests on web applications. I have a deep understanding of performance metrics, scalability, and bottleneck identification, with a focus on ensuring applications can handle expected and peak user loads.""",
         prompt=f"""
@@ -436,7 +508,7 @@ def perform_code_review( code: str) -> str:
     Args:
         code: The code to review
     """
-    return prompt_expert(
+    return consult_with_map_reduce(
         
         description_of_expert="""
         You are a senior software architect with 20 years of experience in code review
@@ -450,7 +522,7 @@ def perform_code_review( code: str) -> str:
         You have a talent for identifying subtle design issues and suggesting practical
         improvements that enhance code quality without over-engineering.
         """,
-        prompt=f"""
+        build_prompt=lambda code: f"""
         Please review the following code and provide detailed improvement suggestions:
 
         {code}
@@ -468,7 +540,10 @@ def perform_code_review( code: str) -> str:
         - Provide the rationale for change
         - Suggest specific improvements
         - Note any trade-offs to consider
-        """
+        """,
+        text=code,
+        merge_instruction="Combine these partial reviews into one code review: merge duplicate findings, order suggestions by importance and keep each one specific.",
+        consult=consult_expert
     )
 
 # @register_tool(tags=["communication"])
@@ -483,7 +558,7 @@ def write_feature_announcement(
         feature_details: Technical details of the feature
         audience: Target audience for the announcement (e.g., "technical", "business")
     """
-    return prompt_expert(
+    return consult_expert(
     
         description_of_expert="""
         You are a senior product marketing manager with 12 years of experience in
@@ -528,80 +603,305 @@ def write_to_file(name: str, content: str) -> str:
         print(f"Error writing file '{name}': {e}")
         return f"Error writing file '{name}': {e}"
 
-@register_tool(tags=["feature_development"])
-def develop_feature( feature_request: str) -> dict:
+class Stage(NamedTuple):
     """
-    Process a feature request through a chain of expert personas.
+    One expert step of develop_feature.
+
+    name: key of the stage's output, used by later stages in depends_on
+    function: the expert call, taking a single text argument
+    depends_on: stages whose outputs this one needs
+    prepare: builds the expert's argument from {"feature_request": ..., <dependency>: output}
+    output_file: markdown file the output is written to
+    extract_code: whether code blocks in the output are written out as project files
     """
-    # Step 1: Product expert defines requirements
-    requirements = generate_detailed_requirements(
-       
-        feature_request
-    )
-    
-    # Write requirements to a file
-    write_to_file("requirements.md", requirements)
+    name: str
+    function: Callable[[str], str]
+    depends_on: Tuple[str, ...]
+    prepare: Callable[[Dict[str, str]], str]
+    output_file: str
+    extract_code: bool = False
+
+
+FEATURE_STAGES = (
+    Stage("requirements", generate_detailed_requirements, (),
+          lambda inputs: inputs["feature_request"], "requirements.md"),
+    Stage("architecture", generate_architecture_document, ("requirements",),
+          lambda inputs: inputs["requirements"], "architecture.md"),
+    Stage("implementation", implement_features, ("architecture",),
+          lambda inputs: inputs["architecture"], "implementation.md", extract_code=True),
+    Stage("tests", design_test_suite, ("implementation",),
+          lambda inputs: f"Create test cases for this implementation: {inputs['implementation']}", "tests.md"),
+    Stage("test_cases", generate_test_cases, ("tests",),
+          lambda inputs: inputs["tests"], "test_cases.md", extract_code=True),
+    Stage("automation_tests", develop_automation_tests, ("tests",),
+          lambda inputs: inputs["tests"], "automation_tests.md", extract_code=True),
+    Stage("load_tests", develop_load_tests, ("tests",),
+          lambda inputs: inputs["tests"], "load_tests.md", extract_code=True),
+    Stage("documentation", generate_technical_documentation, ("implementation",),
+          lambda inputs: f"Document this implementation: {inputs['implementation']}", "documentation.md"),
+)
 
-    # Step 2: Architecture expert designs the solution
-    architecture = generate_architecture_document(
-  
-        requirements
-    )
-    # Write architecture to a file
-    write_to_file("architecture.md", architecture) 
-    
-    # Step 3: Developer expert implements the code
-    implementation = implement_features(
-     
-        architecture
-    )
+# Stages whose documents develop_feature hands back to the agent
+FEATURE_RESULTS = ("requirements", "architecture", "implementation", "tests", "documentation")
 
-    # Write implementation to a file
-    write_to_file  ("implementation.md", implementation)
-    parse_markdown_and_create_structure(implementation)
-    # segregate_code_to_files( implementation)
 
-    # Step 4: QA expert creates test cases
-    tests = design_test_suite(
-        
-       
-        f"Create test cases for this implementation: {implementation}"
-    )
-    # Write tests to a file 
-    write_to_file("tests.md", tests)
-
-    # Step 5: Test expert generates test cases
-    test_cases = generate_test_cases(tests)
-    # Write test cases to a file
-    write_to_file("test_cases.md", test_cases)
-    # Parse test cases and create structure
-    parse_markdown_and_create_structure(test_cases)
-
-    # Step 6: Automation expert develops automation tests
-    # This step assumes the test strategy is provided in the tests variable
-    automation_tests = develop_automation_tests(tests)
-    # Write automation tests to a file
-    write_to_file("automation_tests.md", automation_tests)
-    parse_markdown_and_create_structure(automation_tests)
-    
-    # Step 7: Load test expert creates load tests
-    load_tests = develop_load_tests(tests)
-    # Write load tests to a file
-    write_to_file("load_tests.md", load_tests)
-    parse_markdown_and_create_structure(load_tests)
-
-    # Step 8: Documentation expert creates documentation
-    documentation = generate_technical_documentation(
-        
-        f"Document this implementation: {implementation}"
-    )
-    # Write documentation to a file
-    write_to_file("documentation.md", documentation)    
+def run_stage(stage: Stage, inputs: Dict[str, str], stream: bool = True,
+              prune: bool = False) -> Tuple[str, Optional[dict]]:
+    """
+    Run one stage and write out its document (and code files, if it has any).
+
+    When streaming, the document and code files are written while the expert's
+    response is generated, rather than after it is complete.
+
+    Returns:
+        (the stage's output, manifest of its code files or None), see write_out_stage
+    """
+    if not stream:
+        output = stage.function(stage.prepare(inputs))
+        return output, write_out_stage(stage, output, prune)
+
+    sink = _stage_output.sink = StageOutput(stage, prune)
+    try:
+        output = stage.function(stage.prepare(inputs))
+    except BaseException:
+        _stage_output.sink = None
+        sink.close(complete=False)
+        raise
+    _stage_output.sink = None
+    return output, sink.close()
+
+
+def write_out_stage(stage: Stage, output: str, prune: bool = False) -> Optional[dict]:
+    """
+    Write a stage's document and, for code stages, its code files.
+
+    Code files are recorded under the stage's name in the output directory's
+    manifest: unchanged files are left alone, and with prune, files the stage
+    generated last time but not now are deleted.
+
+    Returns:
+        The BulkWriter manifest of the code files, or None for a stage without code
+    """
+    write_to_file(stage.output_file, output)
+    if not stage.extract_code:
+        return None
+    extractor = CodeBlockStream(source=stage.name, prune=prune)
+    extractor.feed(output)
+    extractor.close()
+    return extractor.manifest
+
+
+def _code_fingerprint(code: CodeType) -> bytes:
+    """Bytecode, names and constants (prompt templates and expert descriptions included) of a code object."""
+    parts = [code.co_code, repr(code.co_names).encode()]
+    for const in code.co_consts:
+        parts.append(_code_fingerprint(const) if isinstance(const, CodeType) else repr(const).encode())
+    return b"\0".join(parts)
+
+
+def stage_key(stage: Stage, inputs: Dict[str, str], model: str) -> str:
+    """
+    Hash of everything a stage's output depends on: the stage's code and prompt
+    templates, the model, and the content of its inputs. An unchanged key means
+    the stored output can be reused.
+    """
+    h = hashlib.sha256()
+    for part in (stage.name.encode(), _code_fingerprint(stage.function.__code__),
+                 _code_fingerprint(stage.prepare.__code__), model.encode()):
+        h.update(part)
+        h.update(b"\0")
+    for name in ("feature_request",) if not stage.depends_on else stage.depends_on:
+        h.update(name.encode() + b"=" + hashlib.sha256(inputs[name].encode("utf-8")).digest())
+    return "stage:" + h.hexdigest()
+
+
+def select_stages(stages: Tuple[Stage, ...], from_stage: str = None,
+                  only: Tuple[str, ...] = None) -> Tuple[Set[str], Set[str]]:
+    """
+    Work out which stages a run includes and which must be recomputed.
+
+    Args:
+        from_stage: Recompute this stage and everything downstream of it
+        only: Recompute just these stages; their upstream stages are taken
+            from stored outputs and nothing downstream is run
+
+    Returns:
+        (names of stages to include, names of stages to recompute even if stored)
+    """
+    by_name = {stage.name: stage for stage in stages}
+    for name in ([from_stage] if from_stage else []) + list(only or []):
+        if name not in by_name:
+            raise ValueError(f"Unknown stage '{name}'. Stages: {', '.join(by_name)}")
+
+    included, forced = set(by_name), set()
+    if from_stage:
+        forced.add(from_stage)
+        for stage in stages:  # dependency order, so descendants are found in one pass
+            if forced & set(stage.depends_on):
+                forced.add(stage.name)
+    if only:
+        forced = set(only)
+        included = set()
+        pending = list(only)
+        while pending:
+            name = pending.pop()
+            if name not in included:
+                included.add(name)
+                pending.extend(by_name[name].depends_on)
+    return included, forced
+
+
+def run_feature_pipeline(feature_request: str,
+                         stages: Tuple[Stage, ...] = FEATURE_STAGES,
+                         max_parallel_stages: int = 4,
+                         store: ArtifactStore = None,
+                         reuse: bool = True,
+                         from_stage: str = None,
+                         only: Tuple[str, ...] = None,
+                         stream: bool = True,
+                         prune: bool = False) -> Dict[str, Dict]:
+    """
+    Run the stages as a dependency graph: each stage starts as soon as the stages
+    it depends on are done, so independent experts work in parallel and the
+    wall-clock time approaches the critical path. A failing stage only skips the
+    stages downstream of it.
+
+    Every output is stored in the artifact store under its stage_key, so a re-run
+    only recomputes the stages whose code, model or inputs changed, and the stages
+    downstream of a changed output.
+
+    Args:
+        store: Artifact store for stage outputs; defaults to the shared one
+        reuse: Whether stored outputs may be used at all
+        from_stage, only: Stage selection, see select_stages
+        stream: Stream expert responses to the output files, see run_stage
+        prune: Delete generated files a code stage no longer produces, see write_out_stage
+
+    Returns:
+        Stage name -> {"status", "result" or "error", "seconds", "cached"}, plus
+        "files" (added/changed/unchanged/removed counts) for stages that wrote code
+    """
+    store = store or get_artifact_store()
+    model = os.getenv("LLM_MODEL", DEFAULT_MODEL)
+    included, forced = select_stages(stages, from_stage, only)
+    cached = set()
+    files = {}
+
+    def task(stage):
+        def run(outputs):
+            inputs = {"feature_request": feature_request, **outputs}
+            key = stage_key(stage, inputs, model)
+            stored = store.get_ref(key) if reuse and stage.name not in forced else None
+            if stored:
+                output = store.get(stored)
+                manifest = write_out_stage(stage, output, prune)
+                cached.add(stage.name)
+            else:
+                if only and stage.name not in forced:
+                    raise RuntimeError(f"No stored output for '{stage.name}' with the current inputs; run it first")
+                output, manifest = run_stage(stage, inputs, stream, prune)
+                store.set_ref(key, store.put(output))
+            if manifest:
+                files[stage.name] = manifest["counts"]
+            return output
+        return run
+
+    selected = [stage for stage in stages if stage.name in included]
+    outcomes = run_dag({stage.name: task(stage) for stage in selected},
+                       {stage.name: list(stage.depends_on) for stage in selected},
+                       max_workers=max_parallel_stages)
+    for name, outcome in outcomes.items():
+        outcome["cached"] = name in cached
+        if name in files:
+            outcome["files"] = files[name]
+    return outcomes
+
+
+def critical_path_seconds(stages: Tuple[Stage, ...], outcomes: Dict[str, Dict]) -> float:
+    """Longest chain of dependent stage timings, the lower bound for the pipeline's wall-clock time."""
+    finished = {}
+    for stage in stages:  # stages are listed in dependency order
+        if stage.name in outcomes:
+            finished[stage.name] = outcomes[stage.name]["seconds"] + max(
+                (finished.get(dep, 0.0) for dep in stage.depends_on), default=0.0)
+    return max(finished.values(), default=0.0)
+
+
+@register_tool(tags=["feature_development"])
+def develop_feature( feature_request: str) -> dict:
+    """
+    Process a feature request through a chain of expert personas.
+
+    Returns a handle (artifact id and summary) for each of the requirements,
+    architecture, implementation, tests and documentation, plus the stage report.
+    Read the documents themselves with read_artifact, passing the handle's
+    artifact id and a line or byte range.
+    """
+    start = time.perf_counter()
+    outcomes = run_feature_pipeline(feature_request)
+    report = pipeline_report(outcomes, time.perf_counter() - start)
+
+    # Return artifact handles rather than the documents themselves; the agent
+    # can read any part of them on demand with read_artifact
+    result = {name: store_artifact(outcomes[name]["result"])
+              for name in FEATURE_RESULTS if outcomes[name]["status"] == "ok"}
+    result.update(report)
+    return result
+
+
+def pipeline_report(outcomes: Dict[str, Dict], wall_seconds: float) -> dict:
+    """Print and return each stage's status and timing, plus the run's wall-clock and critical-path time."""
+    for name, outcome in outcomes.items():
+        print(f"Stage {name}: {outcome['status']}"
+              + (" (stored output)" if outcome.get("cached") else f" in {outcome['seconds']:.1f}s")
+              + (f" ({outcome['error']})" if outcome["status"] != "ok" else "")
+              + (" - files: " + ", ".join(f"{n} {status}" for status, n in outcome["files"].items())
+                 if "files" in outcome else ""))
     return {
-        "requirements": requirements,
-        "architecture": architecture,
-        "implementation": implementation,
-        "tests": tests,
-        "documentation": documentation
+        "stages": {
+            name: {"status": outcome["status"], "seconds": round(outcome["seconds"], 2),
+                   "cached": outcome.get("cached", False),
+                   **({"error": outcome["error"]} if "error" in outcome else {}),
+                   **({"files": outcome["files"]} if "files" in outcome else {})}
+            for name, outcome in outcomes.items()
+        },
+        "wall_seconds": round(wall_seconds, 2),
+        "critical_path_seconds": round(critical_path_seconds(FEATURE_STAGES, outcomes), 2),
     }
 
+
+if __name__ == "__main__":
+    import argparse
+
+    stage_names = [stage.name for stage in FEATURE_STAGES]
+    parser = argparse.ArgumentParser(description="Run the develop_feature expert pipeline, "
+                                                 "reusing stored stage outputs whose inputs are unchanged.")
+    parser.add_argument("feature_request", nargs="?", help="The feature to develop")
+    parser.add_argument("--request-file", help="Read the feature request from this file")
+    parser.add_argument("--from-stage", choices=stage_names,
+                        help="Recompute this stage and everything downstream of it")
+    parser.add_argument("--only", nargs="+", choices=stage_names, metavar="STAGE",
+                        help="Recompute only these stages, using stored outputs for their inputs")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore stored outputs")
+    parser.add_argument("--no-stream", action="store_true",
+                        help="Write stage documents only once each response is complete")
+    parser.add_argument("--max-parallel", type=int, default=4, help="Maximum stages running at once")
+    parser.add_argument("--prune", action="store_true",
+                        help="Delete generated files that a code stage no longer produces")
+    options = parser.parse_args()
+
+    if options.request_file:
+        with open(options.request_file, encoding="utf-8") as f:
+            request = f.read()
+    elif options.feature_request:
+        request = options.feature_request
+    else:
+        parser.error("give a feature request or --request-file")
+
+    start = time.perf_counter()
+    outcomes = run_feature_pipeline(request, max_parallel_stages=options.max_parallel,
+                                    reuse=not options.no_cache, from_stage=options.from_stage,
+                                    only=options.only, stream=not options.no_stream,
+                                    prune=options.prune)
+    report = pipeline_report(outcomes, time.perf_counter() - start)
+    print(f"Done in {report['wall_seconds']}s (critical path {report['critical_path_seconds']}s)")
@@ -49,7 +49,8 @@ class TimeAwareCapability(Capability):
         # Add to existing system message or create new one
         messages = prompt.messages
         if messages and messages[0]["role"] == "system":
-            messages[0]["content"] = system_msg + messages[0]["content"]
+            # Replace rather than mutate: the goal message is shared across prompts
+            messages[0] = {**messages[0], "content": system_msg + messages[0]["content"]}
         else:
             messages.insert(0, {
                 "role": "system",
@@ -0,0 +1,7 @@
+# Imports nothing that registers tools, so routing and prompt code can use it
+# without loading tool modules as a side effect
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token) for prompt accounting."""
+    return (len(text) + 3) // 4
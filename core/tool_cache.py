@@ -0,0 +1,123 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+
+from core.serialization import dumps
+
+
+class ToolResultCache:
+    """
+    Memoizes results of tools registered with cacheable=True.
+
+    Results are keyed by tool name, the hash of the arguments and, when the tool
+    declares a key function, whatever it returns for those arguments (e.g. a
+    file's mtime and size, so edits invalidate the entry). Entries live in a
+    bounded in-memory LRU and, when persist_path is set, in a SQLite file that
+    survives restarts. Only JSON-serializable results are persisted.
+    """
+
+    def __init__(self, max_entries: int = 256, persist_path: str = None):
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self._entries = OrderedDict()  # key -> (created, value)
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._db = None
+
+    def make_key(self, tool_name: str, args: dict, key_fn: Callable = None) -> str:
+        parts = [tool_name, dumps(sorted(args.items()))]
+        if key_fn is not None:
+            parts.append(dumps(key_fn(**args)))
+        return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, tool_name: str, key: str, ttl: float = None) -> Tuple[bool, Any]:
+        """Return (hit, value) for a key, counting the lookup in the tool's hit rate."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            entry = self._load(key)
+            if entry is not None:
+                self._remember(key, entry)
+
+        hit = entry is not None and (ttl is None or now - entry[0] <= ttl)
+        self._count(tool_name, hit)
+        return (True, entry[1]) if hit else (False, None)
+
+    def put(self, tool_name: str, key: str, value: Any):
+        entry = (time.time(), value)
+        self._remember(key, entry)
+        self._store(tool_name, key, entry)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self._connection():
+            with self._lock:
+                self._db.execute("DELETE FROM tool_results")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Dict]:
+        """Per-tool hits, misses and hit rate."""
+        with self._lock:
+            return {
+                name: {**counts, "hit_rate": counts["hits"] / max(1, counts["hits"] + counts["misses"])}
+                for name, counts in self._stats.items()
+            }
+
+    def _count(self, tool_name: str, hit: bool):
+        with self._lock:
+            counts = self._stats.setdefault(tool_name, {"hits": 0, "misses": 0})
+            counts["hits" if hit else "misses"] += 1
+
+    def _remember(self, key: str, entry: tuple):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _connection(self):
+        if self.persist_path and self._db is None:
+            self._db = sqlite3.connect(self.persist_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS tool_results "
+                             "(key TEXT PRIMARY KEY, tool TEXT, created REAL, value TEXT)")
+        return self._db
+
+    def _load(self, key: str):
+        if not self._connection():
+            return None
+        with self._lock:
+            row = self._db.execute("SELECT created, value FROM tool_results WHERE key = ?",
+                                   (key,)).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def _store(self, tool_name: str, key: str, entry: tuple):
+        if not self._connection():
+            return
+        try:
+            value = json.dumps(entry[1])
+        except (TypeError, ValueError):
+            return  # not JSON-serializable, keep it in memory only
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO tool_results VALUES (?, ?, ?, ?)",
+                             (key, tool_name, entry[0], value))
+            self._db.commit()
+
+
+_default_cache = ToolResultCache()
+
+
+def get_tool_cache() -> ToolResultCache:
+    return _default_cache
+
+
+def set_tool_cache(cache: ToolResultCache):
+    global _default_cache
+    _default_cache = cache
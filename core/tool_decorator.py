@@ -3,8 +3,76 @@
 import inspect
 from typing import get_type_hints
 
+from core.json_schema import nullable, schema_for_type
+
 tools = {}
 tools_by_tag = {}
+# Bumped on every registration so indexes built from tools can tell they are stale
+tools_generation = 0
+
+class LazyToolEntry(dict):
+    """
+    An entry in the tools dictionary whose "parameters" schema is computed the
+    first time it is read, so registering a tool at import time stays cheap.
+    """
+
+    def __init__(self, schema_factory, **fields):
+        super().__init__(**fields)
+        self._schema_factory = schema_factory
+
+    def __missing__(self, key):
+        if key != "parameters":
+            raise KeyError(key)
+        schema = self["parameters"] = self._schema_factory()
+        return schema
+
+    def get(self, key, default=None):
+        if key == "parameters":
+            return self[key]
+        return super().get(key, default)
+
+    def __contains__(self, key):
+        return key == "parameters" or super().__contains__(key)
+
+
+def infer_parameters_schema(func) -> dict:
+    """
+    Builds the JSON schema for a function's arguments from its signature and type hints.
+
+    Typing constructs (List[str], Optional, Literal, Dict[str, int], dataclasses...)
+    are translated in full by core.json_schema.schema_for_type. Parameters the
+    environment injects (action_context, cancellation_token, _prefixed) are left out.
+    """
+    signature = inspect.signature(func)
+    type_hints = get_type_hints(func)
+
+    # Build the arguments schema dynamically
+    args_schema = {
+        "type": "object",
+        "properties": {},
+        "required": []
+    }
+    for param_name, param in signature.parameters.items():
+
+        if param_name in ["action_context", "action_agent", "cancellation_token"] or param_name.startswith("_"):
+            continue  # Skip injected parameters
+        if param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+            continue
+
+        # Add parameter details
+        param_type = type_hints.get(param_name, str)  # Default to string if type is not annotated
+        schema = schema_for_type(param_type)
+        # "x: int = None" accepts an explicit null, as Optional[int] would
+        if param.default is None:
+            schema = nullable(schema)
+        args_schema["properties"][param_name] = schema
+
+        # Add to required if not defaulted
+        if param.default == inspect.Parameter.empty:
+            args_schema["required"].append(param_name)
+
+    return args_schema
+
 
 def get_tool_metadata(func, tool_name=None, description=None, parameters_override=None, terminal=False, tags=None):
     """
@@ -29,45 +97,7 @@ def get_tool_metadata(func, tool_name=None, description=None, parameters_overrid
 
     # Discover the function's signature and type hints if no args_override is provided
     if parameters_override is None:
-        signature = inspect.signature(func)
-        type_hints = get_type_hints(func)
-
-        # Build the arguments schema dynamically
-        args_schema = {
-            "type": "object",
-            "properties": {},
-            "required": []
-        }
-        for param_name, param in signature.parameters.items():
-
-            if param_name in ["action_context", "action_agent"]:
-                continue  # Skip these parameters
-
-            def get_json_type(param_type):
-                if param_type == str:
-                    return "string"
-                elif param_type == int:
-                    return "integer"
-                elif param_type == float:
-                    return "number"
-                elif param_type == bool:
-                    return "boolean"
-                elif param_type == list:
-                    return "array"
-                elif param_type == dict:
-                    return "object"
-                else:
-                    return "string"
-
-            # Add parameter details
-            param_type = type_hints.get(param_name, str)  # Default to string if type is not annotated
-            param_schema = {"type": get_json_type(param_type)}  # Convert Python types to JSON schema types
-
-            args_schema["properties"][param_name] = param_schema
-
-            # Add to required if not defaulted
-            if param.default == inspect.Parameter.empty:
-                args_schema["required"].append(param_name)
+        args_schema = infer_parameters_schema(func)
     else:
         args_schema = parameters_override
 
@@ -82,7 +112,9 @@ def get_tool_metadata(func, tool_name=None, description=None, parameters_overrid
     }
 
 
-def register_tool(tool_name=None, description=None, parameters_override=None, terminal=False, tags=None):
+def register_tool(tool_name=None, description=None, parameters_override=None, terminal=False, tags=None,
+                  cacheable=False, ttl=None, key=None, timeout=None, max_concurrency=None,
+                  isolation=None):
     """
     A decorator to dynamically register a function in the tools dictionary with its parameters, schema, and docstring.
 
@@ -92,34 +124,54 @@ def register_tool(tool_name=None, description=None, parameters_override=None, te
         parameters_override (dict, optional): Override for the argument schema. Defaults to dynamically inferred schema.
         terminal (bool, optional): Whether the tool is terminal. Defaults to False.
         tags (List[str], optional): List of tags to associate with the tool.
+        cacheable (bool, optional): Whether results may be memoized by argument hash. Only for pure
+            or slowly changing tools. Defaults to False.
+        ttl (float, optional): Seconds a memoized result stays valid. Defaults to no expiry.
+        key (callable, optional): Called with the tool's arguments; its return value is added to the
+            cache key, e.g. a file's mtime and size so that edits invalidate the entry.
+        timeout (float, optional): Seconds a call may run before it is reported as timed out.
+            Tools that accept a `cancellation_token` parameter are told to stop.
+        max_concurrency (int, optional): Maximum number of concurrent calls of this tool.
+        isolation (str, optional): "process" to run the tool in a pre-forked worker process, for
+            CPU-bound or untrusted tools. Its arguments and result must be picklable.
 
     Returns:
         function: The wrapped function.
     """
+    if isolation not in (None, "thread", "process"):
+        raise ValueError(f"Unknown isolation mode: {isolation}")
+
     def decorator(func):
-        # Use the reusable function to extract metadata
-        metadata = get_tool_metadata(
-            func=func,
-            tool_name=tool_name,
-            description=description,
-            parameters_override=parameters_override,
+        global tools_generation
+        # Only the cheap fields are resolved here; the argument schema needs
+        # inspect.signature/get_type_hints and is built on first access
+        name = tool_name or func.__name__
+
+        # Re-registering a tool replaces it, including its tags
+        previous = tools.get(name)
+        for tag in previous["tags"] if previous else []:
+            tools_by_tag[tag].remove(name)
+
+        tools[name] = LazyToolEntry(
+            schema_factory=lambda: parameters_override if parameters_override is not None
+                                   else infer_parameters_schema(func),
+            description=description or (func.__doc__.strip() if func.__doc__ else "No description provided."),
+            function=func,
             terminal=terminal,
-            tags=tags
+            tags=tags or [],
+            cacheable=cacheable,
+            ttl=ttl,
+            cache_key=key,
+            timeout=timeout,
+            max_concurrency=max_concurrency,
+            isolation=isolation
         )
 
-        # Register the tool in the global dictionary
-        tools[metadata["tool_name"]] = {
-            "description": metadata["description"],
-            "parameters": metadata["parameters"],
-            "function": metadata["function"],
-            "terminal": metadata["terminal"],
-            "tags": metadata["tags"] or []
-        }
-
-        for tag in metadata["tags"]:
+        for tag in tags or []:
             if tag not in tools_by_tag:
                 tools_by_tag[tag] = []
-            tools_by_tag[tag].append(metadata["tool_name"])
+            tools_by_tag[tag].append(name)
 
+        tools_generation += 1
         return func
-    return decorator
\ No newline at end of file
+    return decorator
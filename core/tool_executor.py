@@ -0,0 +1,220 @@
+import functools
+import inspect
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict
+
+from core.action import Action
+
+
+class ToolTimeoutError(TimeoutError):
+    """Raised when a tool does not finish within its timeout."""
+
+    def __init__(self, tool_name: str, timeout: float, stage: str = "running"):
+        super().__init__(f"Tool '{tool_name}' timed out after {timeout}s ({stage})")
+        self.tool_name = tool_name
+        self.timeout = timeout
+        self.stage = stage
+
+
+class CancellationToken:
+    """
+    Handed to tools that declare a `cancellation_token` parameter. Long-running
+    tools should check it between steps and stop once it is cancelled, since a
+    Python thread cannot be interrupted from outside.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise ToolTimeoutError("<cancelled>", 0, "cancelled")
+
+
+@functools.lru_cache(maxsize=None)
+def accepts_cancellation(func: Callable) -> bool:
+    return "cancellation_token" in inspect.signature(func).parameters
+
+
+class ToolExecutor:
+    """
+    Runs tool calls on a managed thread pool with per-tool timeouts and
+    concurrency limits (see register_tool(timeout=..., max_concurrency=...)).
+
+    A timed-out call is reported to the caller as ToolTimeoutError right away;
+    its token is cancelled so a cooperative tool can stop, and its concurrency
+    slot is only released once the work has really finished. Calls made from
+    inside a tool that is already running on the pool run inline, so agents
+    calling agents cannot deadlock the pool.
+    """
+
+    def __init__(self, max_workers: int = 8, default_timeout: float = None):
+        self.max_workers = max_workers
+        self.default_timeout = default_timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._limits = {}
+        self._active = 0
+        self._queued = 0
+        # Every submitted call ends up in exactly one of completed, failed and timeouts;
+        # queue waits are measured over the calls that started on the thread pool
+        self._metrics = {"submitted": 0, "completed": 0, "failed": 0, "timeouts": 0, "pool_started": 0,
+                         "queue_wait_total": 0.0, "queue_wait_max": 0.0, "peak_active": 0}
+
+    def run(self, action: Action, call_args: dict) -> Any:
+        """Run an action with its declared limits and return its result (or raise its error)."""
+        if getattr(self._local, "in_worker", False):
+            return action.execute(**call_args)
+
+        timeout = getattr(action, "timeout", None) or self.default_timeout
+        deadline = time.monotonic() + timeout if timeout else None
+
+        limit = self._limit_for(action)
+        if limit is not None and not limit.acquire(timeout=timeout):
+            with self._lock:
+                self._metrics["timeouts"] += 1
+            raise ToolTimeoutError(action.name, timeout, "waiting for a concurrency slot")
+
+        if getattr(action, "isolation", None) == "process":
+            return self._run_isolated(action, call_args, timeout, limit)
+
+        token = CancellationToken()
+        if accepts_cancellation(action.function):
+            call_args = {**call_args, "cancellation_token": token}
+
+        submitted = time.monotonic()
+        call = {"outcome": None}
+        with self._lock:
+            self._queued += 1
+            self._metrics["submitted"] += 1
+        try:
+            future = self._pool.submit(self._work, action, call_args, submitted, call)
+        except BaseException:
+            with self._lock:
+                self._queued -= 1
+            if limit is not None:
+                limit.release()
+            raise
+        if limit is not None:
+            future.add_done_callback(lambda _: limit.release())
+
+        try:
+            remaining = max(0.0, deadline - time.monotonic()) if deadline else None
+            return future.result(timeout=remaining)
+        except FutureTimeoutError:
+            if not self._settle(call, "timeouts"):
+                # It finished just as the wait ran out
+                return future.result()
+            token.cancel()
+            if future.cancel():  # never started, so it will not run at all
+                with self._lock:
+                    self._queued -= 1
+            raise ToolTimeoutError(action.name, timeout) from None
+
+    def _settle(self, call: dict, outcome: str) -> bool:
+        """Record a call's outcome unless it already has one; returns whether this one counted."""
+        with self._lock:
+            if call["outcome"] is not None:
+                return False
+            call["outcome"] = outcome
+            self._metrics[outcome] += 1
+            return True
+
+    def _run_isolated(self, action: Action, call_args: dict, timeout: float, limit):
+        """Run in the process sandbox; the worker process can be killed, so no token is needed."""
+        from core.process_sandbox import get_process_sandbox
+        with self._lock:
+            self._metrics["submitted"] += 1
+        try:
+            result = get_process_sandbox().run(action, call_args, timeout)
+            outcome = "completed"
+            return result
+        except ToolTimeoutError:
+            outcome = "timeouts"
+            raise
+        except BaseException:
+            outcome = "failed"
+            raise
+        finally:
+            if limit is not None:
+                limit.release()
+            with self._lock:
+                self._metrics[outcome] += 1
+
+    def _work(self, action: Action, call_args: dict, submitted: float, call: dict):
+        wait = time.monotonic() - submitted
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+            self._metrics["pool_started"] += 1
+            self._metrics["queue_wait_total"] += wait
+            self._metrics["queue_wait_max"] = max(self._metrics["queue_wait_max"], wait)
+            self._metrics["peak_active"] = max(self._metrics["peak_active"], self._active)
+        self._local.in_worker = True
+        try:
+            result = action.execute(**call_args)
+            outcome = "completed"
+            return result
+        except BaseException:
+            outcome = "failed"
+            raise
+        finally:
+            self._local.in_worker = False
+            with self._lock:
+                self._active -= 1
+            # Not counted again if the caller already gave up on it as timed out
+            self._settle(call, outcome)
+
+    def _limit_for(self, action: Action):
+        max_concurrency = getattr(action, "max_concurrency", None)
+        if not max_concurrency:
+            return None
+        with self._lock:
+            limit = self._limits.get(action.name)
+            if limit is None:
+                limit = self._limits[action.name] = threading.BoundedSemaphore(max_concurrency)
+            return limit
+
+    def metrics(self) -> Dict:
+        """Pool saturation and queue wait time, for export to a metrics system."""
+        with self._lock:
+            started = self._metrics["pool_started"]
+            return {
+                **self._metrics,
+                "max_workers": self.max_workers,
+                "active": self._active,
+                "queued": self._queued,
+                "saturation": self._active / self.max_workers,
+                "queue_wait_avg": self._metrics["queue_wait_total"] / started if started else 0.0,
+            }
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+_default_executor = None
+_default_lock = threading.Lock()
+
+
+def get_tool_executor() -> ToolExecutor:
+    global _default_executor
+    with _default_lock:
+        if _default_executor is None:
+            _default_executor = ToolExecutor()
+        return _default_executor
+
+
+def set_tool_executor(executor: ToolExecutor):
+    global _default_executor
+    with _default_lock:
+        _default_executor = executor
@@ -0,0 +1,140 @@
+import importlib
+import subprocess
+import sys
+import time
+from importlib.metadata import entry_points
+from typing import List
+
+# Declarative map of the modules that define tools, with the tool names and
+# tags each one registers. A registry asking for a few tags only imports the
+# modules that provide them, instead of every module (and their litellm /
+# requests imports) up front. Keep this in sync when adding tools;
+# verify_manifest() reports drift.
+TOOL_MODULES = {
+    "core.file_operations": {
+        "tools": ["read_project_file", "list_project_files", "write_to_file"],
+        "tags": ["file_operations", "read", "list", "write"],
+    },
+    "core.experts": {
+        "tools": ["generate_technical_documentation", "design_test_suite", "perform_code_review",
+                  "write_feature_announcement", "create_and_consult_expert"],
+        "tags": ["documentation", "testing", "code_quality", "communication"],
+    },
+    "core.technical_experts": {
+        "tools": ["develop_feature"],
+        "tags": ["feature_development"],
+    },
+    "agents.code_reviewer": {
+        "tools": ["analyze_code_quality", "update_review_status"],
+        "tags": ["code_quality", "project_management"],
+    },
+    "core.plan_first_capability": {
+        "tools": ["create_plan"],
+        "tags": ["planning"],
+    },
+    "core.progress_tracking_capability": {
+        "tools": ["track_progress"],
+        "tags": ["prompts"],
+    },
+    "core.json_prompt": {
+        "tools": ["prompt_llm_for_json"],
+        "tags": [],
+    },
+    "core.prompt_expert": {
+        "tools": ["prompt_expert"],
+        "tags": [],
+    },
+    "core.agent_caller": {
+        "tools": ["call_agent", "call_agent_with_reflection", "hand_off_to_agent",
+                  "call_agent_with_selected_context"],
+        "tags": [],
+    },
+    "core.artifact_store": {
+        "tools": ["read_artifact"],
+        "tags": ["artifacts", "feature_development"],
+    },
+}
+
+# Installed packages can contribute tools without editing TOOL_MODULES by
+# declaring entry points in this group, named after the tag they provide:
+#   [project.entry-points."ai_agents.tools"]
+#   documentation = "my_package.doc_tools"
+ENTRY_POINT_GROUP = "ai_agents.tools"
+
+_entry_points = None
+
+
+def tool_entry_points() -> List:
+    """Entry points in ENTRY_POINT_GROUP, scanned once per process (the scan reads package metadata)."""
+    global _entry_points
+    if _entry_points is None:
+        _entry_points = list(entry_points(group=ENTRY_POINT_GROUP))
+    return _entry_points
+
+
+def modules_for(tags: List[str] = None, tool_names: List[str] = None) -> List[str]:
+    """Names of the modules that provide any of the given tags or tools."""
+    wanted_tags = set(tags or [])
+    wanted_tools = set(tool_names or [])
+    modules = [
+        module for module, provides in TOOL_MODULES.items()
+        if wanted_tags.intersection(provides["tags"]) or wanted_tools.intersection(provides["tools"])
+    ]
+    for entry_point in tool_entry_points():
+        if entry_point.name in wanted_tags and entry_point.value not in modules:
+            modules.append(entry_point.value)
+    return modules
+
+
+def load_tools(tags: List[str] = None, tool_names: List[str] = None) -> List[str]:
+    """Import the modules that register the requested tags/tools. Returns the module names."""
+    modules = modules_for(tags, tool_names)
+    for module in modules:
+        if module not in sys.modules:
+            importlib.import_module(module)
+    return modules
+
+
+def verify_manifest() -> List[str]:
+    """Import every manifest module and list differences from what it actually registers."""
+    from core.tool_decorator import tools
+    problems = []
+    for module, provides in TOOL_MODULES.items():
+        try:
+            importlib.import_module(module)
+        except (ImportError, SyntaxError) as e:
+            problems.append(f"{module}: could not be imported ({e})")
+            continue
+        for name in provides["tools"]:
+            entry = tools.get(name)
+            if entry is None:
+                problems.append(f"{module}: tool '{name}' is not registered")
+            elif entry["function"].__module__ != module:
+                problems.append(f"{module}: tool '{name}' is registered by {entry['function'].__module__}")
+            else:
+                missing = set(entry["tags"]) - set(provides["tags"])
+                if missing:
+                    problems.append(f"{module}: tags {sorted(missing)} of '{name}' are not listed")
+    return problems
+
+
+def _measure_cold_start(tags: List[str]):
+    """Time a fresh interpreter building a registry eagerly vs. through the manifest."""
+    eager = ("import importlib; from core.tool_manifest import TOOL_MODULES\n"
+             "for m in TOOL_MODULES:\n"
+             "    try: importlib.import_module(m)\n"
+             "    except (ImportError, SyntaxError) as e: print('skipped', m, e)\n"
+             "from core.python_action_registry import PythonActionRegistry\n"
+             f"PythonActionRegistry(tags={tags!r})")
+    lazy = ("from core.python_action_registry import PythonActionRegistry\n"
+            f"PythonActionRegistry(tags={tags!r})")
+    for label, code in (("import every tool module", eager), ("manifest-driven", lazy)):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        status = "ok" if result.returncode == 0 else result.stderr.strip().splitlines()[-1]
+        print(f"{label:<26} {elapsed * 1000:8.1f} ms  {status}")
+
+
+if __name__ == "__main__":
+    _measure_cold_start(sys.argv[1:] or ["artifacts"])
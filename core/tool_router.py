@@ -0,0 +1,177 @@
+import hashlib
+import json
+import math
+import os
+import re
+from typing import Callable, Dict, List, Sequence
+
+from core.action import Action
+from core.memory import Memory
+from core.tokens import estimate_tokens
+from core.serialization import dumps, render
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, similarity falls back to pure Python
+    np = None
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def hashing_embedding(texts: List[str], dim: int = 512) -> List[List[float]]:
+    """
+    Dependency-free embedding: hashed bag of words and word bigrams, L2-normalized.
+    Good enough to rank tool descriptions; pass a real embedding model to
+    ToolRouter for better recall.
+    """
+    vectors = []
+    for text in texts:
+        words = _WORD.findall(text.lower())
+        vector = [0.0] * dim
+        for token in words + [a + " " + b for a, b in zip(words, words[1:])]:
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:4], "little") % dim
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        vectors.append([v / norm for v in vector])
+    return vectors
+
+
+class ToolRouter:
+    """
+    Offers the LLM only the tools relevant to the current iteration.
+
+    Tool descriptions are embedded once (and cached on disk by description
+    hash). Each iteration the task and the most recent memories are embedded
+    and scored against all tools; the top_k tools plus the always-on ones
+    (terminate and other terminal tools) are passed on to format_actions.
+
+    stats() reports the estimated prompt tokens saved and the miss rate: how
+    often the model invoked a registered tool that had not been offered.
+    """
+
+    def __init__(self,
+                 top_k: int = 8,
+                 always_on: Sequence[str] = ("terminate",),
+                 embed: Callable[[List[str]], List[List[float]]] = hashing_embedding,
+                 embedder_name: str = None,
+                 cache_path: str = ".tool_embeddings.json",
+                 memory_window: int = 4):
+        self.top_k = top_k
+        self.always_on = set(always_on)
+        self.embed = embed
+        self.embedder_name = embedder_name or getattr(embed, "__name__", "embed")
+        self.cache_path = cache_path
+        self.memory_window = memory_window
+
+        self._disk_cache = None
+        self._index_key = None
+        self._index = None
+        self._offered = None
+
+        self.selections = 0
+        self.tokens_offered = 0
+        self.tokens_saved = 0
+        self.invocations = 0
+        self.misses = 0
+
+    def select(self, actions: List[Action], memory: Memory) -> List[Action]:
+        """Return the subset of actions to offer, in their original order."""
+        if len(actions) <= self.top_k:
+            self._offered = {action.name for action in actions}
+            return actions
+
+        names, matrix, sizes = self._tool_index(actions)
+        query = self.embed([self._query_text(memory)])[0]
+        scores = self._similarities(matrix, query)
+
+        ranked = sorted(range(len(names)), key=lambda i: scores[i], reverse=True)
+        chosen = {names[i] for i in ranked[:self.top_k]}
+        chosen.update(action.name for action in actions
+                      if action.terminal or action.name in self.always_on)
+
+        selected = [action for action in actions if action.name in chosen]
+        self._offered = chosen
+        self.selections += 1
+        self.tokens_offered += sum(sizes[i] for i, name in enumerate(names) if name in chosen)
+        self.tokens_saved += sum(sizes[i] for i, name in enumerate(names) if name not in chosen)
+        return selected
+
+    def record_invocation(self, tool_name: str):
+        """Count a tool the model asked for; it is a miss if it was not offered."""
+        self.invocations += 1
+        if self._offered is not None and tool_name not in self._offered:
+            self.misses += 1
+
+    def stats(self) -> Dict:
+        return {
+            "selections": self.selections,
+            "tokens_offered": self.tokens_offered,
+            "tokens_saved": self.tokens_saved,
+            "invocations": self.invocations,
+            "misses": self.misses,
+            "miss_rate": self.misses / self.invocations if self.invocations else 0.0,
+        }
+
+    def _query_text(self, memory: Memory) -> str:
+        items = memory.get_memories()
+        task = [render(m.get("content")) for m in items[:1]]
+        recent = [render(m.get("content", ""))[:2000] for m in items[1:][-self.memory_window:]]
+        return "\n".join(task + recent)
+
+    def _tool_index(self, actions: List[Action]):
+        """Names, embedding matrix and schema token sizes, rebuilt only when the tools change."""
+        key = tuple((action.name, action.description) for action in actions)
+        if key != self._index_key:
+            texts = [f"{action.name.replace('_', ' ')}: {action.description}" for action in actions]
+            vectors = self._embed_cached(texts)
+            sizes = [estimate_tokens(dumps({"name": action.name,
+                                            "description": action.description[:1024],
+                                            "parameters": action.parameters}))
+                     for action in actions]
+            matrix = np.asarray(vectors, dtype=np.float32) if np is not None else vectors
+            self._index = ([action.name for action in actions], matrix, sizes)
+            self._index_key = key
+        return self._index
+
+    def _similarities(self, matrix, query) -> List[float]:
+        if np is not None:
+            q = np.asarray(query, dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(q) or 1.0)
+            return list((matrix @ q) / np.where(norms == 0, 1.0, norms))
+        q_norm = math.sqrt(sum(v * v for v in query)) or 1.0
+        scores = []
+        for row in matrix:
+            r_norm = math.sqrt(sum(v * v for v in row)) or 1.0
+            scores.append(sum(a * b for a, b in zip(row, query)) / (r_norm * q_norm))
+        return scores
+
+    def _embed_cached(self, texts: List[str]) -> List[List[float]]:
+        cache = self._load_disk_cache()
+        keys = [hashlib.sha1(f"{self.embedder_name}\n{text}".encode("utf-8")).hexdigest()
+                for text in texts]
+        missing = [i for i, key in enumerate(keys) if key not in cache]
+        if missing:
+            for i, vector in zip(missing, self.embed([texts[i] for i in missing])):
+                cache[keys[i]] = [float(v) for v in vector]
+            self._save_disk_cache(cache)
+        return [cache[key] for key in keys]
+
+    def _load_disk_cache(self) -> Dict:
+        if self._disk_cache is None:
+            self._disk_cache = {}
+            if self.cache_path and os.path.exists(self.cache_path):
+                try:
+                    with open(self.cache_path, "r") as f:
+                        self._disk_cache = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"Ignoring unreadable tool embedding cache {self.cache_path}: {e}")
+        return self._disk_cache
+
+    def _save_disk_cache(self, cache: Dict):
+        if not self.cache_path:
+            return
+        tmp = self.cache_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(cache, f)
+        os.replace(tmp, self.cache_path)
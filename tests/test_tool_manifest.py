@@ -0,0 +1,18 @@
+import unittest
+
+from core.tool_manifest import modules_for, verify_manifest
+
+
+class ToolManifestTest(unittest.TestCase):
+
+    def test_manifest_matches_registered_tools(self):
+        # Modules whose dependencies are not installed here cannot be checked
+        drift = [p for p in verify_manifest() if "could not be imported" not in p]
+        self.assertEqual(drift, [])
+
+    def test_feature_development_loads_read_artifact(self):
+        self.assertIn("core.artifact_store", modules_for(tags=["feature_development"]))
+
+
+if __name__ == "__main__":
+    unittest.main()